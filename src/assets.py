@@ -0,0 +1,84 @@
+import os
+import shutil
+
+from incremental import hash_file, load_manifest, save_manifest, remove_output, ASSETS_MANIFEST
+
+FINGERPRINT_LENGTH = 8
+
+def list_files(root):
+    files = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            files.append(os.path.relpath(os.path.join(dir_path, file_name), root))
+    return files
+
+def needs_copy(src_path, dest_path, checksum=False):
+    if not os.path.exists(dest_path):
+        return True
+    src_stat = os.stat(src_path)
+    dest_stat = os.stat(dest_path)
+    if src_stat.st_size != dest_stat.st_size:
+        return True
+    if checksum:
+        return hash_file(src_path) != hash_file(dest_path)
+    # copy2 carries the mtime over, so any difference means the source moved on
+    return src_stat.st_mtime_ns != dest_stat.st_mtime_ns
+
+def fingerprint_path(rel_path, digest):
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+def asset_record(record, rel_path):
+    # Older manifests stored only a size per asset, copied under its own name
+    if isinstance(record, dict):
+        return record
+    return {"dest": rel_path}
+
+def asset_digest(src_path, stat, old_record):
+    # Reuse the recorded hash while the file looks untouched, so fingerprinting
+    # does not re-read every image on every build
+    if old_record.get("hash") and old_record.get("size") == stat.st_size and old_record.get("mtime_ns") == stat.st_mtime_ns:
+        return old_record["hash"]
+    return hash_file(src_path)
+
+def sync_static(static_path, output_path, cache_dir, checksum=False, fingerprint=False):
+    old_assets = load_manifest(cache_dir, ASSETS_MANIFEST)
+    new_assets = {}
+    copied = []
+
+    for rel_path in list_files(static_path):
+        src_path = os.path.join(static_path, rel_path)
+        stat = os.stat(src_path)
+        record = {"dest": rel_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if fingerprint:
+            record["hash"] = asset_digest(src_path, stat, asset_record(old_assets.get(rel_path, {}), rel_path))
+            record["dest"] = fingerprint_path(rel_path, record["hash"])
+        dest_path = os.path.join(output_path, record["dest"])
+        if needs_copy(src_path, dest_path, checksum):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.copy2(src_path, dest_path)
+            copied.append(record["dest"])
+        new_assets[rel_path] = record
+
+    # Only files we copied on an earlier sync are ours to delete; generated
+    # pages and anything else living in the output are left alone
+    live_outputs = set([record["dest"] for record in new_assets.values()])
+    removed = []
+    for rel_path, record in old_assets.items():
+        dest = asset_record(record, rel_path)["dest"]
+        if dest not in live_outputs:
+            remove_output(os.path.join(output_path, dest), output_path)
+            removed.append(dest)
+
+    save_manifest(cache_dir, new_assets, ASSETS_MANIFEST)
+    return copied, removed
+
+def load_asset_urls(cache_dir):
+    # Maps each static path to the name it was published under, in URL form
+    asset_urls = {}
+    for rel_path, record in load_manifest(cache_dir, ASSETS_MANIFEST).items():
+        dest = asset_record(record, rel_path)["dest"]
+        if dest != rel_path:
+            asset_urls[rel_path.replace(os.sep, "/")] = dest.replace(os.sep, "/")
+    return asset_urls
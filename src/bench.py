@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from conversions import text_to_textnodes, markdown_to_html_node, markdown_to_blocks, clear_inline_cache
+from main import generate_pages_recursive
+
+CORPORA = ("paragraphs", "links", "lists", "code", "deep")
+
+WORDS = (
+    "ring", "hobbit", "shire", "elf", "wizard", "mountain", "river", "forest",
+    "king", "sword", "road", "shadow", "light", "tower", "song", "journey",
+)
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time each build stage against synthetic corpora")
+    parser.add_argument("--pages", type=int, default=50, help="pages per corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest one is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--corpus", action="append", choices=CORPORA, help="only run these corpora")
+    parser.add_argument("--output", default="./bench_output.json")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a stage counts as a regression")
+    return parser.parse_args(argv)
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def paragraph(rng):
+    sentences = []
+    for _ in range(rng.randint(3, 6)):
+        sentence = words(rng, rng.randint(6, 14))
+        match rng.randint(0, 5):
+            case 0:
+                sentence += f" **{words(rng, 2)}**"
+            case 1:
+                sentence += f" _{words(rng, 2)}_"
+            case 2:
+                sentence += f" `{rng.choice(WORDS)}`"
+        sentences.append(sentence + ".")
+    return " ".join(sentences)
+
+def link_paragraph(rng):
+    links = []
+    for _ in range(rng.randint(20, 40)):
+        target = "/".join(rng.choice(WORDS) for _ in range(3))
+        if rng.randint(0, 9) == 0:
+            links.append(f"![{words(rng, 2)}](/images/{target}.png)")
+        else:
+            links.append(f"[{words(rng, 2)}](/{target})")
+    return " | ".join(links)
+
+def list_block(rng):
+    if rng.randint(0, 1):
+        return "\n".join(f"- {words(rng, rng.randint(2, 8))}" for _ in range(rng.randint(2, 9)))
+    return "\n".join(f"{i}. {words(rng, rng.randint(2, 8))}" for i in range(1, rng.randint(3, 10)))
+
+def code_block(rng):
+    lines = [f"    {words(rng, rng.randint(2, 10))}();" for _ in range(rng.randint(200, 400))]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+def page_markdown(kind, rng, index):
+    blocks = [f"# Page {index} {words(rng, 3)}"]
+    match kind:
+        case "paragraphs":
+            blocks += [paragraph(rng) for _ in range(40)]
+        case "links":
+            blocks += [link_paragraph(rng) for _ in range(20)]
+        case "lists":
+            blocks += [list_block(rng) for _ in range(150)]
+        case "code":
+            blocks += [code_block(rng) for _ in range(5)]
+        case "deep":
+            blocks += [f"## {words(rng, 2)}", paragraph(rng), list_block(rng)]
+    return "\n\n".join(blocks) + "\n"
+
+def page_path(kind, rng, index):
+    if kind != "deep":
+        return os.path.join(f"page{index}", "index.md")
+    parts = [rng.choice(WORDS) for _ in range(rng.randint(4, 10))]
+    return os.path.join(*parts, f"page{index}.md")
+
+def generate_corpus(kind, root, pages, seed):
+    # Seeded per corpus, so the same arguments always produce the same files
+    rng = random.Random(f"{kind}-{seed}")
+    content_dir = os.path.join(root, "content")
+    for index in range(pages):
+        path = os.path.join(content_dir, page_path(kind, rng, index))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(page_markdown(kind, rng, index))
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+    return content_dir, template_path
+
+def read_corpus(content_dir):
+    documents = []
+    for dir_path, _, file_names in os.walk(content_dir):
+        for file_name in sorted(file_names):
+            with open(os.path.join(dir_path, file_name)) as f:
+                documents.append(f.read())
+    return documents
+
+def best_time(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        # Every run starts cold so repeats measure parsing, not the cache
+        clear_inline_cache()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+def bench_corpus(kind, pages, repeat, seed):
+    with tempfile.TemporaryDirectory() as root:
+        content_dir, template_path = generate_corpus(kind, root, pages, seed)
+        documents = read_corpus(content_dir)
+        inline_texts = []
+        for document in documents:
+            for block in markdown_to_blocks(document):
+                if not block.startswith("```"):
+                    inline_texts.extend(block.splitlines())
+        nodes = [markdown_to_html_node(document) for document in documents]
+        dest_dir = os.path.join(root, "docs") + "/"
+
+        results = {
+            "text_to_textnodes": best_time(repeat, lambda: [text_to_textnodes(text) for text in inline_texts]),
+            "markdown_to_html_node": best_time(repeat, lambda: [markdown_to_html_node(document) for document in documents]),
+            "to_html": best_time(repeat, lambda: [node.to_html() for node in nodes]),
+            "generate_pages_recursive": best_time(repeat, lambda: generate_pages_recursive("/", content_dir + "/", template_path, dest_dir)),
+        }
+        return {f"{kind}/{stage}": seconds for stage, seconds in results.items()}
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        if name not in baseline or baseline[name] <= 0:
+            continue
+        ratio = seconds / baseline[name]
+        if ratio > 1 + threshold:
+            regressions.append((name, baseline[name], seconds, ratio))
+    return regressions
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def save_results(path, results, args):
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "pages": args.pages,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    results = {}
+    for kind in args.corpus or CORPORA:
+        results.update(bench_corpus(kind, args.pages, args.repeat, args.seed))
+
+    for name, seconds in sorted(results.items()):
+        print(f"{name:45} {seconds * 1000:10.2f}ms")
+
+    save_results(args.output, results, args)
+    if args.save_baseline:
+        save_results(args.save_baseline, results, args)
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than baseline by more than {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from discovery import is_ignored
+from main import render_page, BuildFailed
+from template import Template
+
+def is_ignored_path(rel_path, ignore):
+    # A file is skipped when it or any directory above it matches, the same
+    # as the directory walk in discover_pages
+    parts = rel_path.split("/")
+    for end in range(1, len(parts) + 1):
+        if is_ignored(parts[end - 1], "/".join(parts[:end]), ignore):
+            return True
+    return False
+
+def build_site(source, output=None, basepath="/", ignore=(), minify=False):
+    # Renders the site in-process. source holds template.html, content/ and
+    # static/; the result maps every output path to its bytes and is also
+    # written to output when one is given. Nothing here touches the disk
+    # unless one of the filesystems is a DiskFS.
+    template = Template(source.read_bytes("template.html").decode("utf-8"), basepath, minify=minify)
+    results = {}
+    for rel_path in source.list_files("static"):
+        results[rel_path] = source.read_bytes("static/" + rel_path)
+
+    failures = {}
+    for rel_path in source.list_files("content"):
+        if not rel_path.endswith(".md") or is_ignored_path(rel_path, ignore):
+            continue
+        md = source.read_bytes("content/" + rel_path).decode("utf-8")
+        try:
+            html = render_page(md, template)
+        except Exception as e:
+            failures["content/" + rel_path] = f"{type(e).__name__}: {e}"
+            continue
+        results[rel_path[:-3] + ".html"] = html.encode("utf-8")
+    if failures:
+        raise BuildFailed(failures)
+
+    if output != None:
+        for path, data in sorted(results.items()):
+            output.write_bytes(path, data)
+    return results
@@ -0,0 +1,43 @@
+import json
+import os
+
+from assets import list_files, asset_digest
+from incremental import load_manifest, save_manifest
+
+OUTPUTS_MANIFEST = "outputs.json"
+
+def scan_outputs(output_path, old_outputs):
+    # Untouched outputs keep their mtime, so their recorded hash is reused
+    # and only files the build actually wrote are read again
+    outputs = {}
+    for rel_path in list_files(output_path):
+        path = os.path.join(output_path, rel_path)
+        stat = os.stat(path)
+        url_path = rel_path.replace(os.sep, "/")
+        outputs[url_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": asset_digest(path, stat, old_outputs.get(url_path, {})),
+        }
+    return outputs
+
+def diff_outputs(old_outputs, new_outputs):
+    changes = {"added": {}, "changed": {}, "removed": []}
+    for path, record in new_outputs.items():
+        if path not in old_outputs:
+            changes["added"][path] = record["hash"]
+        elif old_outputs[path].get("hash") != record["hash"]:
+            changes["changed"][path] = record["hash"]
+    changes["removed"] = sorted([path for path in old_outputs if path not in new_outputs])
+    return changes
+
+def write_changes(output_path, cache_dir, changes_path):
+    # Changes are relative to the last build that wrote a changes manifest,
+    # which is the last deploy as far as the deploy script is concerned
+    old_outputs = load_manifest(cache_dir, OUTPUTS_MANIFEST)
+    new_outputs = scan_outputs(output_path, old_outputs)
+    changes = diff_outputs(old_outputs, new_outputs)
+    with open(changes_path, "w") as f:
+        json.dump(changes, f, indent=1, sort_keys=True)
+    save_manifest(cache_dir, new_outputs, OUTPUTS_MANIFEST)
+    return changes
@@ -0,0 +1,58 @@
+import concurrent.futures
+import os
+import zlib
+
+from assets import list_files
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".svg")
+SIDECAR_EXTENSION = ".gz"
+# wbits of 16 + 15 makes zlib write a gzip header and trailer
+GZIP_WBITS = 31
+
+def gzip_bytes(data):
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def sidecar_is_fresh(path, gz_path):
+    # Sidecars carry their source's mtime, so any rewrite of the source shows
+    try:
+        return os.stat(gz_path).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def compress_file(path):
+    gz_path = path + SIDECAR_EXTENSION
+    if sidecar_is_fresh(path, gz_path):
+        return False
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = gzip_bytes(f.read())
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # Servers never see a half-written sidecar
+    os.replace(tmp_path, gz_path)
+    return True
+
+def compress_outputs(output_path, jobs=None):
+    files = list_files(output_path)
+    sources = [rel_path for rel_path in files if rel_path.endswith(COMPRESSIBLE_EXTENSIONS)]
+
+    # A sidecar whose source is gone would keep being served, drop it. Only
+    # names we could have written count, any other .gz is a static asset.
+    live = set(sources)
+    removed = []
+    for rel_path in files:
+        if not rel_path.endswith(SIDECAR_EXTENSION):
+            continue
+        source = rel_path[:-len(SIDECAR_EXTENSION)]
+        if source.endswith(COMPRESSIBLE_EXTENSIONS) and source not in live:
+            os.remove(os.path.join(output_path, rel_path))
+            removed.append(rel_path)
+
+    # zlib releases the GIL while it compresses, so threads are enough here
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        results = executor.map(compress_file, [os.path.join(output_path, rel_path) for rel_path in sources])
+        compressed = [rel_path for rel_path, written in zip(sources, results) if written]
+    return compressed, removed
@@ -1,8 +1,27 @@
+import functools
 import re
 
-from htmlnode import BlockType, ParentNode, LeafNode, HTMLNode
+from htmlnode import BlockType, ParentNode, LeafNode, HTMLNode, FrozenProps, HEADING_TAGS
 from textnode import TextType, TextNode
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# One alternation for every inline construct; the leftmost match wins, so a
+# single left-to-right scan yields the same node stream as splitting on each
+# delimiter and then on images and links
+INLINE_PATTERN = re.compile(
+    r"\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>.*?)_"
+    r"|`(?P<code>.*?)`"
+    r"|!\[(?P<image_alt>[^\[\]]*)\]\((?P<image_url>[^\(\)]*)\)"
+    r"|(?<!!)\[(?P<link_text>[^\[\]]*)\]\((?P<link_url>[^\(\)]*)\)",
+    re.DOTALL,
+)
+INLINE_MARKERS = ("**", "_", "`")
+DELIMITED_TYPES = {"bold": TextType.BOLD, "italic": TextType.ITALIC, "code": TextType.CODE}
+INLINE_CACHE_SIZE = 4096
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for old_node in old_nodes:
@@ -24,10 +43,10 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
 def split_nodes_image(old_nodes):
     new_nodes = []
@@ -83,13 +102,29 @@ def split_nodes_link(old_nodes):
                 new_nodes.append(TextNode(text_after, TextType.NORMAL))
     return new_nodes
 
+def append_normal_text(nodes, text):
+    if len(text) == 0:
+        return
+    for marker in INLINE_MARKERS:
+        if marker in text:
+            raise ValueError("invalid markdown, formatted section not closed")
+    nodes.append(TextNode(text, TextType.NORMAL))
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.NORMAL)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    nodes = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        append_normal_text(nodes, text[position:match.start()])
+        position = match.end()
+        kind = match.lastgroup
+        if kind == "image_url":
+            nodes.append(TextNode(match.group("image_alt"), TextType.IMAGE, match.group("image_url")))
+        elif kind == "link_url":
+            nodes.append(TextNode(match.group("link_text"), TextType.LINK, match.group("link_url")))
+        elif len(match.group(kind)) > 0:
+            # Empty formatted sections are dropped just like empty split sections
+            nodes.append(TextNode(match.group(kind), DELIMITED_TYPES[kind]))
+    append_normal_text(nodes, text[position:])
     return nodes
 
 def text_node_to_html_node(text_node):
@@ -109,54 +144,78 @@ def text_node_to_html_node(text_node):
         case _:
             raise Exception("invalid text type")
 
-def markdown_to_blocks(markdown):
-    blocks = markdown.split('\n\n')
-    index = 0
-    while index < len(blocks):
-        blocks[index] = blocks[index].strip()
-        if len(blocks[index]) == 0:
-            blocks.pop(index)
+def split_block_lines(lines):
+    # Walks the document once; an empty line ends the current block, exactly
+    # where splitting the whole text on blank lines would
+    block = []
+    for line in lines:
+        if len(line) == 0:
+            if block:
+                trimmed = trim_block_lines(block)
+                if trimmed:
+                    yield trimmed
+                block = []
             continue
-        index += 1
+        block.append(line)
+    if block:
+        trimmed = trim_block_lines(block)
+        if trimmed:
+            yield trimmed
 
-    return blocks
+def trim_block_lines(lines):
+    # Line-wise equivalent of str.strip() on the joined block
+    start = 0
+    end = len(lines)
+    while start < end and lines[start].strip() == "":
+        start += 1
+    while end > start and lines[end - 1].strip() == "":
+        end -= 1
+    if start == end:
+        return []
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines
+
+def scan_blocks(lines):
+    for block_lines in split_block_lines(lines):
+        yield lines_to_block_type(block_lines), block_lines
+
+def markdown_to_blocks(markdown):
+    return ['\n'.join(lines) for lines in split_block_lines(markdown.split("\n"))]
 
 def block_to_block_type(md):
     if len(md) == 0:
         raise Exception("empty block has no block type")
-    
-    match md[0]:
+    return lines_to_block_type(md.split("\n"))
+
+def lines_to_block_type(lines):
+    first = lines[0]
+    match first[0]:
         case '#':
-            total_hash = 1
-            for i in range(1, len(md)):
-                if md[i] == '#':
-                    total_hash += 1
-                    if total_hash > 6:
-                        return BlockType.PARAGRAPH
-                    continue
-                elif md[i] == ' ':
-                    return BlockType.HEADING
+            total_hash = count_heading(first)
+            if total_hash > 6:
                 return BlockType.PARAGRAPH
+            if first[total_hash:total_hash + 1] == ' ':
+                return BlockType.HEADING
+            return BlockType.PARAGRAPH
         case '`':
-            if len(md) < 6:
+            if sum(map(len, lines)) + len(lines) - 1 < 6:
                 return BlockType.PARAGRAPH
-            if md[:3] == '```' and md[-3:] == '```':
+            if first[:3] == '```' and lines[-1][-3:] == '```':
                 return BlockType.CODE
             return BlockType.PARAGRAPH
         case '>':
-            lines = md.splitlines()
             for line in lines:
                 if line[0] != '>':
                     return BlockType.PARAGRAPH
             return BlockType.QUOTE
         case '-':
-            lines = md.splitlines()
             for line in lines:
                 if line[0:2] != '- ':
                     return BlockType.PARAGRAPH
             return BlockType.UNORDERED_LIST
         case '1':
-            lines = md.splitlines()
             tally = 1
             for line in lines:
                 if line[0:3] != f"{tally}. ":
@@ -173,68 +232,134 @@ def count_heading(block):
             count += 1
         else:
             return count
-        
+    return count
+
+def build_inline_leaves(text):
+    # The leaves are shared by every block with the same text, so they are
+    # handed out as a tuple with read-only props and must never be mutated
+    leaves = []
+    for text_node in text_to_textnodes(text):
+        leaf = text_node_to_html_node(text_node)
+        if leaf.props != None:
+            leaf.props = FrozenProps(leaf.props)
+        leaves.append(leaf)
+    return tuple(leaves)
+
+cached_inline_leaves = functools.lru_cache(maxsize=INLINE_CACHE_SIZE)(build_inline_leaves)
+
+def set_inline_cache_size(maxsize):
+    global cached_inline_leaves
+    cached_inline_leaves = functools.lru_cache(maxsize=maxsize)(build_inline_leaves)
+
+def inline_cache_info():
+    return cached_inline_leaves.cache_info()
+
+def clear_inline_cache():
+    cached_inline_leaves.cache_clear()
+
+def inline_children(text):
+    return list(cached_inline_leaves(text))
+
 def block_to_html_node(block, block_type):
-    if block_type == BlockType.CODE:
-        return ParentNode("pre", [text_node_to_html_node(TextNode(block.strip('`').lstrip('\n'), TextType.CODE))])
-    
+    return lines_to_html_node(block.split("\n"), block_type)
+
+def lines_to_html_node(lines, block_type):
     match block_type:
+        case BlockType.CODE:
+            code = '\n'.join(lines).strip('`').lstrip('\n')
+            return ParentNode("pre", [text_node_to_html_node(TextNode(code, TextType.CODE))])
         case BlockType.PARAGRAPH:
-            block = block.replace('\n', ' ')
-            textnodes = text_to_textnodes(block)
-            children = list(map(text_node_to_html_node, textnodes))
-            return ParentNode("p", children)
+            return ParentNode("p", inline_children(' '.join(lines)))
         case BlockType.HEADING:
-            heading_count = count_heading(block)
-            block = block.replace('\n', ' ').lstrip('# ')
-            textnodes = text_to_textnodes(block)
-            children = list(map(text_node_to_html_node, textnodes))
-            return ParentNode(f"h{heading_count}", children)
+            heading_count = count_heading(lines[0])
+            text = ' '.join(lines).lstrip('# ')
+            return ParentNode(HEADING_TAGS[heading_count - 1], inline_children(text))
         case BlockType.QUOTE:
-            lines = block.splitlines()
-            for i in range(0, len(lines)):
-                lines[i] = lines[i].lstrip("> ")
-            block = '\n'.join(lines)
-            textnodes = text_to_textnodes(block)
-            children = list(map(text_node_to_html_node, textnodes))
-            return ParentNode("blockquote", children)
+            text = '\n'.join([line.lstrip("> ") for line in lines])
+            return ParentNode("blockquote", inline_children(text))
         case BlockType.UNORDERED_LIST:
-            children = []
-            lines = block.splitlines()
-            for line in lines:
-                line = line.lstrip('- ')
-                textnodes = text_to_textnodes(line)
-                nested_children = list(map(text_node_to_html_node, textnodes))
-                children.append(ParentNode('li', nested_children))
+            children = [ParentNode('li', inline_children(line.lstrip('- '))) for line in lines]
             return ParentNode("ul", children)
         case BlockType.ORDERED_LIST:
-            children = []
-            lines = block.splitlines()
-            for line in lines:
-                line = line.lstrip('0123456789. ')
-                textnodes = text_to_textnodes(line)
-                nested_children = list(map(text_node_to_html_node, textnodes))
-                children.append(ParentNode('li', nested_children))
+            children = [ParentNode('li', inline_children(line.lstrip('0123456789. '))) for line in lines]
             return ParentNode("ol", children)
         case _:
             raise Exception("invalid block type")
     
         
+class ParseResult:
+    __slots__ = ("node", "title", "headings", "word_count", "first_image")
+
+    def __init__(self, node, title=None, headings=None, word_count=0, first_image=None):
+        self.node = node
+        self.title = title
+        self.headings = headings if headings != None else []
+        self.word_count = word_count
+        self.first_image = first_image
+
+    def require_title(self):
+        if self.title == None:
+            raise Exception("h1 heading / title missing")
+        return self.title
+
+    def __repr__(self):
+        return f"ParseResult({self.title}, {self.headings}, {self.word_count}, {self.first_image})"
+
+def iter_leaves(node):
+    if node.children == None:
+        yield node
+        return
+    for child in node.children:
+        yield from iter_leaves(child)
+
+def parse_lines(lines):
+    # Builds the tree and gathers page metadata from the same scan, so
+    # callers never need a second pass over the document
+    result = ParseResult(None)
+    children = []
+    for block_type, block_lines in scan_blocks(lines):
+        block_node = lines_to_html_node(block_lines, block_type)
+        children.append(block_node)
+        if block_type == BlockType.HEADING:
+            level = count_heading(block_lines[0])
+            if level == 1 and result.title == None:
+                result.title = '\n'.join(block_lines)[2:]
+            result.headings.append((level, "".join([leaf.value for leaf in iter_leaves(block_node)])))
+        for leaf in iter_leaves(block_node):
+            result.word_count += len(leaf.value.split())
+            if leaf.tag == "img" and result.first_image == None:
+                result.first_image = (leaf.props["src"], leaf.props["alt"])
+    result.node = ParentNode("div", children)
+    return result
+
+def parse_markdown(document):
+    return parse_lines(document.split("\n"))
+
 def markdown_to_html_node(document):
-    blocks = markdown_to_blocks(document)
-    new_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        new_nodes.append(block_to_html_node(block, block_type))
-    parent = ParentNode("div", new_nodes)
-    return parent
+    return parse_markdown(document).node
     
 def extract_title(md):
-    blocks = markdown_to_blocks(md)
-    for block in blocks:
-        if block_to_block_type(block) == BlockType.HEADING:
-            heading_count = count_heading(block)
-            if heading_count == 1:
-                return block[2:]
+    # Kept for callers that only want the title; it scans blocks without
+    # parsing any inline markdown
+    return find_title(md.split("\n"))
+
+def find_title(lines):
+    for block_type, block_lines in scan_blocks(lines):
+        if block_type == BlockType.HEADING and count_heading(block_lines[0]) == 1:
+            return '\n'.join(block_lines)[2:]
     raise Exception("h1 heading / title missing")
-    
\ No newline at end of file
+
+class StreamedDocument:
+    # Stands in for the "div" node of a whole document: each block is
+    # rendered and written as soon as it is scanned, so only one block is
+    # ever held in memory. open_lines is called to get a fresh line iterator.
+    __slots__ = ("open_lines",)
+
+    def __init__(self, open_lines):
+        self.open_lines = open_lines
+
+    def render_into(self, write, context=None):
+        write("<div>")
+        for block_type, lines in scan_blocks(self.open_lines()):
+            lines_to_html_node(lines, block_type).render_into(write, context)
+        write("</div>")
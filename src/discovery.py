@@ -0,0 +1,36 @@
+import fnmatch
+import os
+
+DISCOVERY_MANIFEST = "discovery.json"
+
+def is_ignored(name, rel_path, ignore):
+    # Patterns match either the bare name or the path under the content dir,
+    # so "drafts" and "blog/*/notes.md" both work
+    for pattern in ignore:
+        if fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(rel_path, pattern):
+            return True
+    return False
+
+def discover_pages(dir_path_content, dest_dir_path, ignore=()):
+    # One scandir walk; DirEntry answers is_dir from the directory listing
+    # itself, so only the markdown files we keep are ever stat'ed
+    found = []
+    stack = [(dir_path_content, dest_dir_path, "")]
+    while stack:
+        dir_path, dest_path, rel_dir = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                if is_ignored(entry.name, rel_path, ignore):
+                    continue
+                if entry.is_dir():
+                    stack.append((entry.path, os.path.join(dest_path, entry.name), rel_path + "/"))
+                elif entry.name.endswith(".md"):
+                    stat = entry.stat()
+                    found.append((entry.path, {
+                        "dest": os.path.join(dest_path, entry.name[:-3] + ".html"),
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                    }))
+    # Sorted by source, so the same tree always gives the same manifest
+    return dict(sorted(found))
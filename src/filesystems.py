@@ -0,0 +1,70 @@
+import os
+import zipfile
+
+from assets import list_files
+
+# Every backend speaks in "/"-separated paths relative to its root and in
+# bytes, so a site can be read from or written to any of them
+
+class DiskFS:
+    def __init__(self, root):
+        self.root = root
+
+    def full_path(self, path):
+        return os.path.join(self.root, *path.split("/"))
+
+    def list_files(self, directory):
+        path = self.full_path(directory)
+        if not os.path.isdir(path):
+            return []
+        return [rel_path.replace(os.sep, "/") for rel_path in list_files(path)]
+
+    def read_bytes(self, path):
+        with open(self.full_path(path), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, path, data):
+        full_path = self.full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+
+class DictFS:
+    def __init__(self, files=None):
+        # Text is accepted for convenience when building sites by hand
+        self.files = {}
+        for path, data in (files or {}).items():
+            self.write_bytes(path, data)
+
+    def list_files(self, directory):
+        prefix = directory.rstrip("/") + "/"
+        return sorted([path[len(prefix):] for path in self.files if path.startswith(prefix)])
+
+    def read_bytes(self, path):
+        return self.files[path]
+
+    def write_bytes(self, path, data):
+        self.files[path] = data.encode("utf-8") if isinstance(data, str) else data
+
+class ZipFS:
+    def __init__(self, file, mode="r"):
+        self.archive = zipfile.ZipFile(file, mode, zipfile.ZIP_DEFLATED)
+
+    def list_files(self, directory):
+        prefix = directory.rstrip("/") + "/"
+        return sorted([name[len(prefix):] for name in self.archive.namelist() if name.startswith(prefix) and not name.endswith("/")])
+
+    def read_bytes(self, path):
+        return self.archive.read(path)
+
+    def write_bytes(self, path, data):
+        self.archive.writestr(path, data)
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,19 @@
+import os
+import tempfile
+import unittest
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+class TempDirTestCase(unittest.TestCase):
+    # Each test gets its own scratch directory at self.root
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
@@ -1,6 +1,12 @@
+import re
+import sys
+from array import array
 from enum import Enum
 from textnode import TextType, TextNode
 
+# Tags built at runtime are interned once here so every node shares them
+HEADING_TAGS = tuple(sys.intern(f"h{level}") for level in range(1, 7))
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -9,53 +15,290 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
+URL_PROPS = ("href", "src")
+# Only HTML's own whitespace; \s would also swallow non-breaking spaces
+WHITESPACE_RUN = re.compile(r"[ \t\n\r\f]+")
+# Leaves whose text is shown exactly as written
+PRESERVE_WHITESPACE_TAGS = ("code", "pre")
+
+def collapse_whitespace(text):
+    return WHITESPACE_RUN.sub(" ", text)
+
+class RenderContext:
+    # Everything a render needs beyond the tree itself. Root-relative URLs in
+    # href and src props are pointed at the basepath and, when assets are
+    # fingerprinted, at the fingerprinted file name. With image_sizes set,
+    # images also get their dimensions and every image after the first on a
+    # page is loaded lazily. With minify set, runs of whitespace in text
+    # collapse to one space, except inside code.
+    __slots__ = ("basepath", "asset_urls", "image_sizes", "minify", "images_seen")
+
+    def __init__(self, basepath="/", asset_urls=None, image_sizes=None, minify=False):
+        self.basepath = basepath
+        self.asset_urls = asset_urls if asset_urls != None else {}
+        self.image_sizes = image_sizes
+        self.minify = minify
+        self.images_seen = 0
+
+    def for_page(self):
+        # A fresh copy per page, so "first image" means first on this page
+        return RenderContext(self.basepath, self.asset_urls, self.image_sizes, self.minify)
+
+    def text(self, tag, value):
+        if self.minify and tag not in PRESERVE_WHITESPACE_TAGS:
+            return collapse_whitespace(value)
+        return value
+
+    def split_local_url(self, url):
+        # Returns the site path of a root-relative URL and whatever query or
+        # fragment follows it, or None for anything pointing elsewhere
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+        path = url[1:]
+        end = len(path)
+        for marker in "?#":
+            index = path.find(marker)
+            if index != -1 and index < end:
+                end = index
+        return path[:end], path[end:]
+
+    def rewrite_url(self, url):
+        local = self.split_local_url(url)
+        if local == None:
+            return url
+        path, rest = local
+        return self.basepath + self.asset_urls.get(path, path) + rest
+
+    def image_attributes(self, src):
+        if self.image_sizes == None:
+            return ""
+        props = []
+        local = self.split_local_url(src) if src != None else None
+        if local != None and local[0] in self.image_sizes:
+            width, height = self.image_sizes[local[0]]
+            props.append(("width", width))
+            props.append(("height", height))
+        # The first image is usually above the fold, so it loads eagerly
+        if self.images_seen > 0:
+            props.append(("loading", "lazy"))
+            props.append(("decoding", "async"))
+        self.images_seen += 1
+        return props_html(props)
+
+class FrozenProps(dict):
+    # Props shared between cached leaves. A dict underneath, so it renders,
+    # pickles and deep-copies like any other props, but it refuses changes.
+    __slots__ = ()
+
+    def refuse(self, *args, **kwargs):
+        raise TypeError("shared props are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = refuse
+    clear = pop = popitem = setdefault = update = refuse
+
+    def __reduce__(self):
+        return (FrozenProps, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return self
+
+def props_html(props, context=None):
+    if context == None:
+        return "".join([f" {prop}=\"{value}\"" for prop, value in props])
+    return "".join([
+        f" {prop}=\"{context.rewrite_url(value) if prop in URL_PROPS else value}\""
+        for prop, value in props
+    ])
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
     
-    def to_html(self):
+    def to_html(self, context=None):
+        fragments = []
+        self.render_into(fragments.append, context)
+        return "".join(fragments)
+
+    def render_into(self, write, context=None):
         raise NotImplementedError()
 
-    def props_to_html(self):
+    def props_to_html(self, context=None):
         if self.props == None:
             return ""
-        
-        html_string = ""
-        for prop in self.props:
-            html_string += " " + prop + "=\"" + self.props[prop] + "\""
-        return html_string
+        return props_html(self.props.items(), context)
     
     def __repr__(self):
         return f"HTMLNode: ({self.tag}, {self.value}, {self.children}, {self.props})"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def render_into(self, write, context=None):
         if self.value == None:
             raise ValueError()
+        value = self.value if context == None else context.text(self.tag, self.value)
         if self.tag == None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            write(value)
+            return
+        attributes = self.props_to_html(context)
+        if self.tag == "img" and context != None:
+            attributes += context.image_attributes(self.props.get("src") if self.props else None)
+        write(f"<{self.tag}{attributes}>{value}</{self.tag}>")
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def render_into(self, write, context=None):
         if self.tag == None:
             raise ValueError("invalid tag")
         if self.children == None:
             raise ValueError("invalid children")
-        html_str = f"<{self.tag}{self.props_to_html()}>"
-        html_end = f"</{self.tag}>"
+        # Children write straight into the caller's sink, so no intermediate
+        # strings are built on the way up the tree
+        write(f"<{self.tag}{self.props_to_html(context)}>")
         for child in self.children:
-            html_str += child.to_html()
-        return html_str + html_end
+            child.render_into(write, context)
+        write(f"</{self.tag}>")
+
+class NodeArena:
+    # A whole document flattened in pre-order into parallel arrays: one
+    # entry per node instead of one object (and props dict) per node.
+    # child_counts holds -1 for leaves and the number of children otherwise.
+    __slots__ = ("tags", "values", "props", "child_counts")
+
+    def __init__(self):
+        self.tags = []
+        self.values = []
+        self.props = []
+        self.child_counts = array("i")
+
+    @classmethod
+    def from_node(cls, root):
+        arena = cls()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            arena.tags.append(sys.intern(node.tag) if node.tag != None else None)
+            arena.props.append(tuple(node.props.items()) if node.props else None)
+            if isinstance(node, ParentNode):
+                arena.values.append(None)
+                arena.child_counts.append(len(node.children))
+                stack.extend(reversed(node.children))
+            else:
+                arena.values.append(node.value)
+                arena.child_counts.append(-1)
+        return arena
+
+    def __len__(self):
+        return len(self.tags)
+
+    def to_data(self):
+        # Plain lists, tuples and bytes only, so marshal can store it as is
+        return (self.tags, self.values, self.props, self.child_counts.tobytes())
+
+    @classmethod
+    def from_data(cls, data):
+        arena = cls()
+        tags, values, props, child_counts = data
+        arena.tags = [sys.intern(tag) if tag != None else None for tag in tags]
+        arena.values = values
+        arena.props = props
+        arena.child_counts.frombytes(child_counts)
+        return arena
+
+    def to_node(self):
+        position = 0
+
+        def build():
+            nonlocal position
+            index = position
+            position += 1
+            props = dict(self.props[index]) if self.props[index] else None
+            if self.child_counts[index] < 0:
+                return LeafNode(self.tags[index], self.values[index], props)
+            children = [build() for _ in range(self.child_counts[index])]
+            return ParentNode(self.tags[index], children, props)
+
+        return build()
+
+    def render_into(self, write, context=None):
+        # Iterative so arbitrarily deep documents never hit the recursion limit;
+        # each stack entry is an open tag and how many children it still awaits
+        open_tags = []
+        for index in range(len(self.tags)):
+            tag = self.tags[index]
+            props = self.props[index]
+            attributes = props_html(props, context) if props else ""
+            if tag == "img" and context != None:
+                attributes += context.image_attributes(dict(props).get("src") if props else None)
+            child_count = self.child_counts[index]
+            if child_count > 0:
+                write(f"<{tag}{attributes}>")
+                open_tags.append([tag, child_count])
+                continue
+            value = self.values[index]
+            if context != None and child_count < 0:
+                value = context.text(tag, value)
+            if child_count == 0:
+                write(f"<{tag}{attributes}></{tag}>")
+            elif tag == None:
+                write(value)
+            else:
+                write(f"<{tag}{attributes}>{value}</{tag}>")
+            # This node is done, close every ancestor it was the last child of
+            while open_tags:
+                open_tags[-1][1] -= 1
+                if open_tags[-1][1] > 0:
+                    break
+                write(f"</{open_tags.pop()[0]}>")
+
+    def to_html(self, context=None):
+        fragments = []
+        self.render_into(fragments.append, context)
+        return "".join(fragments)
+
+class ArenaDocument:
+    # A page body kept as one NodeArena per block under the root "div", so
+    # blocks can be cached apart and spliced back together. It renders like
+    # the tree it came from, context and all, which keeps cached bodies on
+    # the same rewriting path as freshly parsed ones.
+    __slots__ = ("blocks",)
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    @classmethod
+    def from_node(cls, root):
+        return cls([NodeArena.from_node(child) for child in root.children])
+
+    def to_data(self):
+        return [block.to_data() for block in self.blocks]
+
+    @classmethod
+    def from_data(cls, data):
+        return cls([NodeArena.from_data(block) for block in data])
+
+    def render_into(self, write, context=None):
+        write("<div>")
+        for block in self.blocks:
+            block.render_into(write, context)
+        write("</div>")
+
+    def to_html(self, context=None):
+        fragments = []
+        self.render_into(fragments.append, context)
+        return "".join(fragments)
 
 def text_node_to_html_node(text_node):
     match text_node.text_type:
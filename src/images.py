@@ -0,0 +1,82 @@
+import os
+import struct
+
+from assets import list_files, asset_digest
+from incremental import load_manifest, save_manifest
+
+IMAGES_MANIFEST = "images.json"
+IMAGE_EXTENSIONS = (".png", ".gif", ".jpg", ".jpeg")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the dimensions; C4, C8 and CC share the
+# range but are Huffman, extension and arithmetic coding tables
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def png_size(f):
+    header = f.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def gif_size(f):
+    header = f.read(10)
+    if len(header) < 10 or header[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    return struct.unpack("<HH", header[6:10])
+
+def jpeg_size(f):
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Fill bytes may pad out the space between segments
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        segment_length = struct.unpack(">H", length)[0]
+        if marker[1] in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(segment_length - 2, os.SEEK_CUR)
+
+def read_image_size(path):
+    # Only the header is read, never the pixel data
+    with open(path, "rb") as f:
+        for reader in (png_size, gif_size, jpeg_size):
+            f.seek(0)
+            size = reader(f)
+            if size != None:
+                return size
+    return None
+
+def load_image_sizes(static_path, cache_dir):
+    # Maps each image's site path to its (width, height); dimensions are
+    # cached alongside the file hash and only read again when it changes
+    old_images = load_manifest(cache_dir, IMAGES_MANIFEST)
+    new_images = {}
+    image_sizes = {}
+    for rel_path in list_files(static_path):
+        if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(static_path, rel_path)
+        stat = os.stat(path)
+        old_record = old_images.get(rel_path, {})
+        digest = asset_digest(path, stat, old_record)
+        if old_record.get("hash") == digest:
+            size = old_record.get("width"), old_record.get("height")
+        else:
+            size = read_image_size(path) or (None, None)
+        new_images[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest, "width": size[0], "height": size[1]}
+        if size[0] != None:
+            image_sizes[rel_path.replace(os.sep, "/")] = tuple(size)
+    save_manifest(cache_dir, new_images, IMAGES_MANIFEST)
+    return image_sizes
@@ -0,0 +1,95 @@
+import contextlib
+import filecmp
+import hashlib
+import json
+import os
+
+PAGES_MANIFEST = "pages.json"
+ASSETS_MANIFEST = "assets.json"
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def page_entry(source_hash, template_hash, basepath, dest_path, assets_hash=None):
+    return {
+        "source_hash": source_hash,
+        "template_hash": template_hash,
+        "basepath": basepath,
+        "assets_hash": assets_hash,
+        "dest": dest_path,
+    }
+
+def hash_asset_urls(asset_urls, image_sizes=None):
+    # Everything about static files that ends up inside a page
+    if image_sizes != None:
+        return hash_bytes(json.dumps([asset_urls, image_sizes], sort_keys=True).encode())
+    if not asset_urls:
+        return None
+    return hash_bytes(json.dumps(asset_urls, sort_keys=True).encode())
+
+def load_manifest(cache_dir, name=PAGES_MANIFEST):
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest only costs us a full rebuild
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+def save_manifest(cache_dir, entries, name=PAGES_MANIFEST):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entries, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+@contextlib.contextmanager
+def output_file(dest_path, buffering=-1):
+    # Renders into a temporary file next to the output, then only replaces
+    # the output when the bytes differ, so unchanged pages keep their mtime
+    # and readers never see a half-written page
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", buffering=buffering) as f:
+            yield f
+        if os.path.exists(dest_path) and filecmp.cmp(tmp_path, dest_path, shallow=False):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def needs_rebuild(old_entry, new_entry):
+    if old_entry != new_entry:
+        return True
+    return not os.path.exists(new_entry["dest"])
+
+def source_changed(old_entry, new_entry):
+    # A page's body depends only on its source; the template, basepath and
+    # asset names are applied when the body is wrapped
+    return old_entry == None or old_entry.get("source_hash") != new_entry["source_hash"]
+
+def remove_output(dest_path, dest_root):
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    # Prune directories left empty by the removal, but never the root itself
+    root = os.path.abspath(dest_root)
+    parent = os.path.dirname(os.path.abspath(dest_path))
+    while parent != root and parent.startswith(root) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
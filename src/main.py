@@ -1,61 +1,328 @@
+import argparse
+import concurrent.futures
 import os
 import shutil
 import sys
+import tracemalloc
 
 from textnode import TextType, TextNode
-from htmlnode import ParentNode, LeafNode
-from conversions import markdown_to_html_node, extract_title
+from htmlnode import ParentNode, LeafNode, ArenaDocument
+from conversions import parse_markdown, find_title, StreamedDocument
+from assets import sync_static, load_asset_urls
+from compress import compress_outputs
+from changes import write_changes
+from images import load_image_sizes
+from discovery import discover_pages, DISCOVERY_MANIFEST
+from shard import parse_shard, select_shard, write_shard_manifest, merge_shards
+from template import load_template
+from report import PageTimer, BuildReport
+from parsecache import ParseCache, BodyCache, FragmentCache, parse_cached
+from incremental import hash_bytes, hash_file, hash_asset_urls, page_entry, load_manifest, save_manifest, needs_rebuild, source_changed, remove_output, output_file
+
+WRITE_BUFFER_SIZE = 1 << 16
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild pages whose inputs changed and sync static assets in place")
+    parser.add_argument("--checksum", action="store_true", help="compare static assets by content hash instead of size and mtime")
+    parser.add_argument("--fingerprint", action="store_true", help="publish static assets under content-hashed names and point pages at them")
+    parser.add_argument("--gzip", action="store_true", help="write a precompressed .gz next to every HTML, CSS and SVG output")
+    parser.add_argument("--changes-manifest", help="write the outputs added, changed and removed since the last such build here, with their hashes")
+    parser.add_argument("--image-hints", action="store_true", help="give images their width and height and lazy-load all but the first on each page")
+    parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN", help="skip content files and directories matching this glob (repeatable)")
+    parser.add_argument("--minify", action="store_true", help="collapse insignificant whitespace in the template and page text, leaving pre and code alone")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N", help="render only the I-th of N stable partitions of the pages, for spreading a build over machines")
+    parser.add_argument("--merge", nargs="+", metavar="SHARD_DIR", help="check and combine the outputs of every --shard build with ./static into ./docs")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="render pages in N processes (0 uses every core)")
+    parser.add_argument("--cache-dir", default="./.ssg-cache", help="where build manifests and caches are kept")
+    parser.add_argument("--parse-cache", action="store_true", help="keep parsed pages on disk keyed by their markdown hash")
+    parser.add_argument("--parse-cache-mb", type=int, default=256, help="size cap for the parse cache, oldest entries are evicted first")
+    parser.add_argument("--stream-threshold-mb", type=int, default=STREAM_THRESHOLD // (1024 * 1024), help="pages at least this large are rendered block by block in constant memory")
+    parser.add_argument("--report", help="time every page phase and write a JSON report here")
+    parser.add_argument("--report-top", type=int, default=10, help="how many of the slowest pages to list after a --report build")
+    args = parser.parse_args(argv)
+    if args.shard and (args.incremental or args.fingerprint or args.merge):
+        parser.error("--shard always builds from scratch and cannot be combined with --incremental, --fingerprint or --merge")
+    return args
 
 def main():
-    basepath = sys.argv[1] if len(sys.argv) > 1 else '/'
-    preprocess("./static", "./docs")
-    generate_pages_recursive(basepath, "./content/", "./template.html", "./docs/")
-
-def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path):
-    # First, get a list of files and directories in this directory
-    dir_contents = os.listdir(dir_path_content)
-
-    # Loop through the list, calling this function on each directory
-    # and adding generating each page in the destination
-    for content in dir_contents:
-        if os.path.isfile(dir_path_content+content):
-            # Ignore non-markdown files
-            if not content[-3:] == '.md':
-                continue
-            generate_page(basepath, dir_path_content+content, template_path, dest_dir_path+content.replace('.md', '.html'))
+    args = parse_args(sys.argv[1:])
+    report = None
+    if args.report:
+        report = BuildReport()
+        tracemalloc.start()
+    parse_cache = None
+    if args.parse_cache:
+        parse_cache = ParseCache(args.cache_dir, args.parse_cache_mb * 1024 * 1024)
+    try:
+        if args.merge:
+            merge_shards(args.merge, "./static", "./docs")
+        else:
+            build(args, report, parse_cache)
+        if args.gzip:
+            compress_outputs("./docs", args.jobs or None)
+        if args.changes_manifest:
+            write_changes("./docs", args.cache_dir, args.changes_manifest)
+    finally:
+        if parse_cache != None:
+            parse_cache.evict()
+        # Failed builds are exactly the ones worth a report
+        if report != None:
+            report.save(args.report)
+            print(report.summary(args.report_top))
+
+def build(args, report=None, parse_cache=None):
+    if args.shard:
+        # Static files are copied once, by the merge
+        clean_output("./docs")
+    elif args.incremental:
+        sync_static("./static", "./docs", args.cache_dir, args.checksum, args.fingerprint)
+    else:
+        preprocess("./static", "./docs", args.cache_dir, args.fingerprint)
+    asset_urls = load_asset_urls(args.cache_dir) if args.fingerprint else None
+    image_sizes = load_image_sizes("./static", args.cache_dir) if args.image_hints else None
+    stream_threshold = args.stream_threshold_mb * 1024 * 1024
+    if args.incremental:
+        generate_pages_incremental(args.basepath, "./content/", "./template.html", "./docs/", args.cache_dir, args.jobs, report, parse_cache, stream_threshold, asset_urls, image_sizes, args.ignore, args.minify)
+    else:
+        generate_pages_recursive(args.basepath, "./content/", "./template.html", "./docs/", args.jobs, report, parse_cache, stream_threshold, asset_urls, image_sizes, args.ignore, args.shard, args.minify)
+
+def find_pages(dir_path_content, dest_dir_path, ignore=()):
+    for from_path, page in discover_pages(dir_path_content, dest_dir_path, ignore).items():
+        yield from_path, page["dest"]
+
+def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path, jobs=1, report=None, parse_cache=None, stream_threshold=STREAM_THRESHOLD, asset_urls=None, image_sizes=None, ignore=(), shard=None, minify=False):
+    pages = list(find_pages(dir_path_content, dest_dir_path, ignore))
+    if shard != None:
+        pages = select_shard(pages, dir_path_content, shard)
+    failures = generate_pages(basepath, pages, template_path, jobs, report, parse_cache, stream_threshold, asset_urls, image_sizes=image_sizes, minify=minify)
+    if failures:
+        raise BuildFailed(failures)
+    if shard != None:
+        write_shard_manifest(dest_dir_path, shard, [dest_path for _, dest_path in pages])
+
+def generate_pages_incremental(basepath, dir_path_content, template_path, dest_dir_path, cache_dir, jobs=1, report=None, parse_cache=None, stream_threshold=STREAM_THRESHOLD, asset_urls=None, image_sizes=None, ignore=(), minify=False):
+    old_pages = load_manifest(cache_dir)
+    old_found = load_manifest(cache_dir, DISCOVERY_MANIFEST)
+    found = discover_pages(dir_path_content, dest_dir_path, ignore)
+    template_hash = hash_file(template_path)
+    if minify:
+        # A minified template is a different template as far as pages go
+        template_hash = hash_bytes(f"minify:{template_hash}".encode())
+    assets_hash = hash_asset_urls(asset_urls, image_sizes)
+    body_cache = BodyCache(cache_dir)
+    fragment_cache = FragmentCache(cache_dir)
+    template = None
+
+    new_pages = {}
+    stale_pages = []
+    failures = {}
+    for from_path, page in found.items():
+        dest_path = page["dest"]
+        old_entry = old_pages.get(from_path)
+        # A source whose size and mtime match the last walk keeps its hash,
+        # so unchanged pages are never read at all
+        if old_entry != None and old_found.get(from_path) == page:
+            source_hash = old_entry["source_hash"]
         else:
-            generate_pages_recursive(basepath, dir_path_content+content+"/", template_path, dest_dir_path+content+'/')
+            source_hash = hash_file(from_path)
+        entry = page_entry(source_hash, template_hash, basepath, dest_path, assets_hash)
+        new_pages[from_path] = entry
+        if not needs_rebuild(old_entry, entry):
+            continue
+        # When only the template, basepath or asset names moved on, the
+        # cached body is wrapped again and the source is never parsed
+        body = None if source_changed(old_entry, entry) else body_cache.get(entry["source_hash"])
+        if body == None:
+            stale_pages.append((from_path, dest_path))
+            continue
+        if template == None:
+            template = load_template(template_path, basepath, asset_urls, image_sizes, minify)
+        try:
+            rewrap_page(template, body, dest_path)
+        except Exception as e:
+            failures[from_path] = f"{type(e).__name__}: {e}"
+
+    failures.update(generate_pages(basepath, stale_pages, template_path, jobs, report, parse_cache, stream_threshold, asset_urls, body_cache, image_sizes, fragment_cache, minify))
+    # Pages that failed stay out of the manifest so the next build retries them
+    for from_path in failures:
+        del new_pages[from_path]
+
+    # Sources that disappeared since the last build take their outputs with them
+    live_outputs = set(entry["dest"] for entry in new_pages.values())
+    for from_path, entry in old_pages.items():
+        if from_path not in new_pages and entry["dest"] not in live_outputs:
+            remove_output(entry["dest"], dest_dir_path)
+
+    save_manifest(cache_dir, new_pages)
+    save_manifest(cache_dir, found, DISCOVERY_MANIFEST)
+    body_cache.prune([entry["source_hash"] for entry in new_pages.values()])
+    fragment_cache.prune(new_pages)
+    if failures:
+        raise BuildFailed(failures)
+
+def generate_pages(basepath, pages, template_path, jobs=1, report=None, parse_cache=None, stream_threshold=STREAM_THRESHOLD, asset_urls=None, body_cache=None, image_sizes=None, fragment_cache=None, minify=False):
+    if not pages:
+        return {}
+    template = load_template(template_path, basepath, asset_urls, image_sizes, minify)
+    profile = report != None
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(pages) <= 1:
+        results = [generate_page_job(basepath, from_path, template_path, dest_path, template, profile, parse_cache, stream_threshold, body_cache, fragment_cache) for from_path, dest_path in pages]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(pages))) as pool:
+            futures = [pool.submit(generate_page_job, basepath, from_path, template_path, dest_path, template, profile, parse_cache, stream_threshold, body_cache, fragment_cache) for from_path, dest_path in pages]
+            results = [future.result() for future in futures]
+
+    failures = {}
+    for (from_path, _), (error, page_stats) in zip(pages, results):
+        if error is not None:
+            failures[from_path] = error
+        if page_stats is not None:
+            report.add(page_stats)
+    return failures
+
+def generate_page_job(basepath, from_path, template_path, dest_path, template=None, profile=False, parse_cache=None, stream_threshold=STREAM_THRESHOLD, body_cache=None, fragment_cache=None):
+    # Errors come back as strings so one bad page cannot take down the pool
+    # and every failure can be reported together at the end
+    try:
+        if os.path.getsize(from_path) >= stream_threshold:
+            return None, generate_page_streaming(basepath, from_path, template_path, dest_path, template, profile)
+        if profile:
+            return None, generate_page_profiled(basepath, from_path, template_path, dest_path, template, parse_cache, body_cache)
+        generate_page(basepath, from_path, template_path, dest_path, template, parse_cache, body_cache, fragment_cache)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None
+    return None, None
 
-    
+def format_failures(failures):
+    lines = [f"{len(failures)} page(s) failed to build:"]
+    for from_path in sorted(failures):
+        lines.append(f"  {from_path}: {failures[from_path]}")
+    return "\n".join(lines)
 
-def generate_page(basepath, from_path, template_path, dest_path):
+class BuildFailed(Exception):
+    # Carries every page's error, so callers that keep going (watch mode)
+    # can report them without parsing the message
+    def __init__(self, failures):
+        super().__init__(format_failures(failures))
+        self.failures = failures
+
+
+def generate_page(basepath, from_path, template_path, dest_path, template=None, parse_cache=None, body_cache=None, fragment_cache=None):
     md_file = open(from_path)
     md = md_file.read()
     md_file.close()
 
-    template_file = open(template_path)
-    template = template_file.read()
-    template_file.close()
+    if template is None:
+        template = load_template(template_path, basepath)
+
+    if fragment_cache != None:
+        title, content = fragment_cache.render(from_path, md, parse_cache)
+        if title == None:
+            raise Exception("h1 heading / title missing")
+    else:
+        result = parse_cached(md, parse_cache)
+        title = result.require_title()
+        # The page streams straight into a buffered file rather than being
+        # assembled into one big string first; a body kept for later
+        # template changes renders from its arena just the same
+        content = result.node
+        if body_cache != None:
+            content = ArenaDocument.from_node(result.node)
+    if body_cache != None:
+        body_cache.put(hash_file(from_path), title, content)
+    with output_file(dest_path, WRITE_BUFFER_SIZE) as dest_file:
+        template.render_into(dest_file.write, Title=title, Content=content)
+
+def generate_page_profiled(basepath, from_path, template_path, dest_path, template=None, parse_cache=None, body_cache=None):
+    # Same steps as generate_page, but with the content rendered to a string
+    # first so to_html, template substitution and the write can be timed apart.
+    # The body is rendered with the page's context, exactly as render_into
+    # would, so a profiled build writes the same bytes as a plain one.
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if template is None:
+        template = load_template(template_path, basepath)
+    timer = PageTimer(from_path)
+
+    with open(from_path) as md_file:
+        md = md_file.read()
+    timer.bytes_in = os.path.getsize(from_path)
+    timer.lap("read")
+
+    result = parse_cached(md, parse_cache)
+    title = result.require_title()
+    timer.lap("parse")
+
+    html_string = result.node.to_html(template.page_context())
+    if body_cache != None:
+        body_cache.put(hash_file(from_path), title, ArenaDocument.from_node(result.node))
+    timer.lap("to_html")
 
-    html_node = markdown_to_html_node(md)
-    html_string = html_node.to_html()
+    dest = template.render(Title=title, Content=html_string)
+    timer.lap("template")
 
-    title = extract_title(md)
+    with output_file(dest_path) as dest_file:
+        dest_file.write(dest)
+    # Bytes on disk, the same unit as bytes_in, not characters written
+    timer.bytes_out = os.path.getsize(dest_path)
+    timer.lap("write")
+    return timer.finish()
 
-    dest = template.replace("{{ Title }}", title).replace("{{ Content }}", html_string).replace("href=\"/", f"href=\"{basepath}").replace("src=\"/", f"src=\"{basepath}")
+def rewrap_page(template, body, dest_path):
+    title, document = body
+    with output_file(dest_path, WRITE_BUFFER_SIZE) as dest_file:
+        template.render_into(dest_file.write, Title=title, Content=document)
 
-    dest_dir = os.path.dirname(dest_path)
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-    
-    dest_file = open(dest_path, "w")
-    dest_file.write(dest)
-    dest_file.close()
+def stream_lines(path):
+    with open(path) as md_file:
+        for line in md_file:
+            yield line.rstrip("\n")
 
+def generate_page_streaming(basepath, from_path, template_path, dest_path, template=None, profile=False):
+    # For sources too big to hold in memory: one cheap pass finds the title
+    # (the template needs it before the content), then a second pass renders
+    # each block straight to the output as it is read
+    if template is None:
+        template = load_template(template_path, basepath)
+    timer = PageTimer(from_path) if profile else None
 
-def preprocess(static_path, output_path):
+    title = find_title(stream_lines(from_path))
+    document = StreamedDocument(lambda: stream_lines(from_path))
+
+    with output_file(dest_path, WRITE_BUFFER_SIZE) as dest_file:
+        template.render_into(dest_file.write, Title=title, Content=document)
+
+    if timer == None:
+        return None
+    timer.bytes_in = os.path.getsize(from_path)
+    timer.bytes_out = os.path.getsize(dest_path)
+    timer.lap("stream")
+    return timer.finish()
+
+def render_page(md, template):
+    result = parse_markdown(md)
+    title = result.require_title()
+
+    fragments = []
+    template.render_into(fragments.append, Title=title, Content=result.node)
+    return "".join(fragments)
+
+
+def clean_output(output_path):
     if os.path.exists(output_path):
         shutil.rmtree(output_path, False)
+
+def preprocess(static_path, output_path, cache_dir=None, fingerprint=False):
+    clean_output(output_path)
+    if fingerprint:
+        sync_static(static_path, output_path, cache_dir, fingerprint=True)
+        return
     shutil.copytree(static_path,output_path)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import marshal
+import os
+import sys
+
+from conversions import ParseResult, parse_markdown, scan_blocks, lines_to_html_node, count_heading
+from htmlnode import ArenaDocument, NodeArena, BlockType
+from incremental import hash_bytes
+
+# Bump whenever a parser change alters the tree or metadata for the same
+# markdown, so stale entries simply stop matching
+PARSER_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class ParseCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.join(cache_dir, "parse")
+        self.max_bytes = max_bytes
+
+    def key(self, md):
+        # marshal's format is tied to the interpreter, so it is part of the key
+        salt = f"{PARSER_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}:".encode()
+        return hash_bytes(salt + md.encode("utf-8"))
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, md):
+        path = self.path_for(self.key(md))
+        try:
+            with open(path, "rb") as f:
+                data = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            # A truncated or foreign entry is just a miss
+            return None
+        # Touching the entry on every hit makes mtime the LRU order
+        os.utime(path)
+        return result_from_data(data)
+
+    def put(self, md, result):
+        path = self.path_for(self.key(md))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            marshal.dump(result_to_data(result), f)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum([size for _, size, _ in entries])
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+class BodyCache:
+    # Page bodies keyed by source hash, so a template change can re-wrap
+    # them without parsing anything. They are kept as arenas rather than
+    # HTML so the basepath, asset names and image hints of the build they
+    # are wrapped in still apply.
+    def __init__(self, cache_dir):
+        self.directory = os.path.join(cache_dir, "bodies")
+
+    def key(self, source_hash):
+        return hash_bytes(f"{PARSER_VERSION}:{source_hash}".encode())
+
+    def path_for(self, source_hash):
+        key = self.key(source_hash)
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, source_hash):
+        try:
+            with open(self.path_for(source_hash), "rb") as f:
+                title, data = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return title, ArenaDocument.from_data(data)
+
+    def put(self, source_hash, title, document):
+        path = self.path_for(source_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            marshal.dump((title, document.to_data()), f)
+        os.replace(tmp_path, path)
+
+    def prune(self, source_hashes):
+        # Bodies for sources no page uses any more are dead weight
+        live = set([self.key(source_hash) for source_hash in source_hashes])
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return removed
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name not in live:
+                    os.remove(os.path.join(dir_path, file_name))
+                    removed += 1
+        return removed
+
+class FragmentCache:
+    # The parsed arena of every block of a page, keyed by block type and
+    # text. After a small edit only the blocks that changed are parsed; the
+    # rest are spliced in from the page's previous render.
+    def __init__(self, cache_dir):
+        self.directory = os.path.join(cache_dir, "fragments")
+
+    def key(self, page):
+        return hash_bytes(f"{PARSER_VERSION}:{page}".encode())
+
+    def path_for(self, page):
+        key = self.key(page)
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, page):
+        try:
+            with open(self.path_for(page), "rb") as f:
+                fragments = marshal.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+        return fragments if isinstance(fragments, dict) else {}
+
+    def put(self, page, fragments):
+        path = self.path_for(page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            marshal.dump(fragments, f)
+        os.replace(tmp_path, path)
+
+    def render(self, page, md, parse_cache=None):
+        # Returns the page title and a document that renders the same as
+        # parsing the whole page would. Missed blocks are parsed one by one;
+        # only a page with nothing stored yet goes through the parse cache,
+        # whose whole-page key would miss after any edit.
+        old_fragments = self.get(page)
+        if old_fragments:
+            parse_cache = None
+        fragments = {}
+        title = None
+        blocks = []
+        tree = None
+        for index, (block_type, block_lines) in enumerate(scan_blocks(md.split("\n"))):
+            text = "\n".join(block_lines)
+            if block_type == BlockType.HEADING and title == None and count_heading(text) == 1:
+                title = text[2:]
+            key = hash_bytes(f"{block_type.value}:{text}".encode())
+            fragment = fragments.get(key) or old_fragments.get(key)
+            if fragment == None:
+                if parse_cache != None:
+                    # The whole tree has one child per scanned block
+                    if tree == None:
+                        tree = parse_cached(md, parse_cache).node
+                    node = tree.children[index]
+                else:
+                    node = lines_to_html_node(block_lines, block_type)
+                fragment = NodeArena.from_node(node).to_data()
+            fragments[key] = fragment
+            blocks.append(NodeArena.from_data(fragment))
+        # Only this render's blocks are kept, so the store never outgrows the page
+        self.put(page, fragments)
+        return title, ArenaDocument(blocks)
+
+    def prune(self, pages):
+        live = set([self.key(page) for page in pages])
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return removed
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name not in live:
+                    os.remove(os.path.join(dir_path, file_name))
+                    removed += 1
+        return removed
+
+def result_to_data(result):
+    arena = NodeArena.from_node(result.node)
+    return (arena.to_data(), result.title, result.headings, result.word_count, result.first_image)
+
+def result_from_data(data):
+    arena_data, title, headings, word_count, first_image = data
+    node = NodeArena.from_data(arena_data).to_node()
+    return ParseResult(node, title, [tuple(heading) for heading in headings], word_count, tuple(first_image) if first_image != None else None)
+
+def parse_cached(md, parse_cache=None):
+    if parse_cache == None:
+        return parse_markdown(md)
+    result = parse_cache.get(md)
+    if result == None:
+        result = parse_markdown(md)
+        parse_cache.put(md, result)
+    return result
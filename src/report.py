@@ -0,0 +1,77 @@
+import json
+import time
+import tracemalloc
+
+PHASES = ("read", "parse", "to_html", "template", "write")
+
+class PageTimer:
+    def __init__(self, source):
+        self.source = source
+        self.phases = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_bytes = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = now - self.last
+        self.last = now
+
+    def finish(self):
+        if tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        return {
+            "source": self.source,
+            "total": self.last - self.start,
+            "phases": self.phases,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_bytes": self.peak_bytes,
+        }
+
+class BuildReport:
+    def __init__(self):
+        self.pages = []
+        self.start = time.perf_counter()
+
+    def add(self, page_stats):
+        self.pages.append(page_stats)
+
+    def phase_totals(self):
+        totals = dict.fromkeys(PHASES, 0.0)
+        for page in self.pages:
+            for phase, seconds in page["phases"].items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def slowest(self, top):
+        return sorted(self.pages, key=lambda page: page["total"], reverse=True)[:top]
+
+    def to_dict(self):
+        return {
+            "wall_time": time.perf_counter() - self.start,
+            "page_count": len(self.pages),
+            "phase_totals": self.phase_totals(),
+            "bytes_in": sum([page["bytes_in"] for page in self.pages]),
+            "bytes_out": sum([page["bytes_out"] for page in self.pages]),
+            "pages": sorted(self.pages, key=lambda page: page["source"]),
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def summary(self, top=10):
+        totals = self.phase_totals()
+        lines = [f"Built {len(self.pages)} page(s); time per phase across all pages:"]
+        for phase, seconds in totals.items():
+            lines.append(f"  {phase:10} {seconds * 1000:10.2f}ms")
+        lines.append(f"Slowest {min(top, len(self.pages))} page(s):")
+        for page in self.slowest(top):
+            peak = f"{page['peak_bytes'] / 1024:.0f}KiB peak" if page["peak_bytes"] != None else "peak n/a"
+            lines.append(f"  {page['total'] * 1000:10.2f}ms  {peak:>14}  {page['source']}")
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from incremental import hash_bytes, hash_file
+
+SHARD_MANIFEST = ".shard.json"
+
+def parse_shard(text):
+    # "2/4" is the second of four shards; used as an argparse type
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text} is out of range, i must be between 1 and N")
+    return index, count
+
+def shard_of(rel_path, count):
+    # Hashes the path under the content dir, never the absolute path, so
+    # every runner agrees however the checkout is laid out
+    return int(hash_bytes(rel_path.encode())[:16], 16) % count + 1
+
+def select_shard(pages, dir_path_content, shard):
+    index, count = shard
+    selected = []
+    for from_path, dest_path in pages:
+        rel_path = os.path.relpath(from_path, dir_path_content).replace(os.sep, "/")
+        if shard_of(rel_path, count) == index:
+            selected.append((from_path, dest_path))
+    return selected
+
+def write_shard_manifest(dest_dir_path, shard, dest_paths):
+    index, count = shard
+    outputs = {}
+    for dest_path in dest_paths:
+        outputs[os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")] = hash_file(dest_path)
+    os.makedirs(dest_dir_path, exist_ok=True)
+    with open(os.path.join(dest_dir_path, SHARD_MANIFEST), "w") as f:
+        json.dump({"shard": index, "count": count, "outputs": outputs}, f, indent=1, sort_keys=True)
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"{shard_dir} is not a shard build, {SHARD_MANIFEST} is missing")
+    except ValueError:
+        raise ValueError(f"{path} is corrupt")
+
+def validate_shards(shard_dirs):
+    manifests = [load_shard_manifest(shard_dir) for shard_dir in shard_dirs]
+    counts = set([manifest["count"] for manifest in manifests])
+    if len(counts) != 1:
+        raise ValueError(f"shards were built with different counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = sorted([manifest["shard"] for manifest in manifests])
+    if indexes != list(range(1, count + 1)):
+        raise ValueError(f"expected shards 1 to {count} once each, got {indexes}")
+
+    owners = {}
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        for rel_path, digest in manifest["outputs"].items():
+            if rel_path in owners:
+                raise ValueError(f"{rel_path} was built by both {owners[rel_path]} and {shard_dir}")
+            owners[rel_path] = shard_dir
+            path = os.path.join(shard_dir, rel_path)
+            if not os.path.isfile(path) or hash_file(path) != digest:
+                raise ValueError(f"{path} is missing or does not match its shard manifest")
+    return owners
+
+def merge_shards(shard_dirs, static_path, output_path):
+    # Everything is checked and the merged site assembled beside the output
+    # before it is touched, so a bad set of shards leaves the previous site
+    # in place, and a shard built into the output dir itself is still
+    # there to copy from
+    owners = validate_shards(shard_dirs)
+    output_path = os.path.normpath(output_path)
+    staging = tempfile.mkdtemp(prefix=".merge-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        merged_path = os.path.join(staging, "site")
+        shutil.copytree(static_path, merged_path)
+        for rel_path, shard_dir in sorted(owners.items()):
+            dest_path = os.path.join(merged_path, rel_path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.copy2(os.path.join(shard_dir, rel_path), dest_path)
+        # A directory cannot be replaced in one step, so the old site is
+        # moved aside and only removed once the new one is in place
+        if os.path.exists(output_path):
+            os.rename(output_path, os.path.join(staging, "previous"))
+        os.rename(merged_path, output_path)
+    finally:
+        shutil.rmtree(staging, True)
+    return sorted(owners)
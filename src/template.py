@@ -0,0 +1,119 @@
+import re
+
+from htmlnode import RenderContext, collapse_whitespace
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r"(?<![\w-])(href|src)=\"([^\"]*)\"")
+# Elements whose content is shown or run exactly as written
+PRESERVED_PATTERN = re.compile(r"<(pre|code|textarea|script|style)\b.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+# A whole tag, quoted attribute values and all, even when they hold a ">"
+TAG_PATTERN = re.compile(r"<(?:[^>\"']|\"[^\"]*\"|'[^']*')*>")
+# Whitespace next to these tags never renders, so it can go entirely
+BLOCK_TAG_SPACE_PATTERN = re.compile(
+    r"[ \t\n\r\f]*(<!doctype[^>]*>|</?(?:html|head|body|title|meta|link|script|style|div|p|h[1-6]|ul|ol|li|"
+    r"article|main|header|footer|nav|section|aside|blockquote|pre|table|thead|tbody|tr|td|th|hr|br)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>)[ \t\n\r\f]*",
+    re.IGNORECASE,
+)
+
+def make_context(basepath="/", asset_urls=None, image_sizes=None, minify=False):
+    # No context means nothing to rewrite, which keeps the default build on
+    # the plain rendering path
+    if basepath == "/" and not asset_urls and image_sizes == None and not minify:
+        return None
+    return RenderContext(basepath, asset_urls, image_sizes, minify)
+
+def collapse_text(html):
+    # Only text between tags collapses; whatever is inside a tag, attribute
+    # values in particular, is kept exactly as written
+    pieces = []
+    position = 0
+    for match in TAG_PATTERN.finditer(html):
+        pieces.append(collapse_whitespace(html[position:match.start()]))
+        pieces.append(match.group(0))
+        position = match.end()
+    pieces.append(collapse_whitespace(html[position:]))
+    return "".join(pieces)
+
+def minify_html(html):
+    # For the template: whitespace around block tags is dropped and every
+    # other run between tags becomes one space. Each stretch between preserved elements
+    # is minified with bare copies of their tags around it, so whitespace
+    # next to a <pre> or <script> goes too.
+    pieces = []
+    position = 0
+    before = ""
+    for match in PRESERVED_PATTERN.finditer(html):
+        after = f"<{match.group(1)}>"
+        text = collapse_text(BLOCK_TAG_SPACE_PATTERN.sub(r"\1", before + html[position:match.start()] + after))
+        pieces.append(text[len(before):len(text) - len(after)])
+        pieces.append(match.group(0))
+        position = match.end()
+        before = f"</{match.group(1)}>"
+    text = collapse_text(BLOCK_TAG_SPACE_PATTERN.sub(r"\1", before + html[position:]))
+    pieces.append(text[len(before):])
+    return "".join(pieces)
+
+def rewrite_html_urls(html, context):
+    if context == None:
+        return html
+    return URL_ATTRIBUTE_PATTERN.sub(lambda match: f"{match.group(1)}=\"{context.rewrite_url(match.group(2))}\"", html)
+
+class Template:
+    def __init__(self, text, basepath="/", asset_urls=None, image_sizes=None, minify=False):
+        self.basepath = basepath
+        self.context = make_context(basepath, asset_urls, image_sizes, minify)
+        if minify:
+            text = minify_html(text)
+        # Template links are rewritten once here instead of on every page
+        text = rewrite_html_urls(text, self.context)
+
+        # pieces alternates static text with slot placeholders; slot_indexes
+        # records where each named slot sits so rendering is a single join
+        self.pieces = []
+        self.slot_indexes = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.pieces.append(text[position:match.start()])
+            self.slot_indexes.append((len(self.pieces), match.group(1)))
+            self.pieces.append(None)
+            position = match.end()
+        self.pieces.append(text[position:])
+
+    @property
+    def slots(self):
+        return [name for _, name in self.slot_indexes]
+
+    def page_context(self):
+        return self.context.for_page() if self.context != None else None
+
+    def render(self, **values):
+        fragments = []
+        self.render_into(fragments.append, **values)
+        return "".join(fragments)
+
+    def render_into(self, write, **values):
+        for name in self.slots:
+            if name not in values:
+                raise ValueError(f"no value for template slot {name}")
+        slot_names = dict(self.slot_indexes)
+        context = self.page_context()
+        # Static pieces were rewritten at compile time; nodes rewrite their
+        # own href and src props as they render
+        for index, piece in enumerate(self.pieces):
+            if piece is not None:
+                write(piece)
+                continue
+            value = values[slot_names[index]]
+            # Slots take either nodes that stream themselves or strings that
+            # are already final HTML for this page, written as they are
+            if isinstance(value, str):
+                write(value)
+            else:
+                value.render_into(write, context)
+
+    def __repr__(self):
+        return f"Template({self.slots}, {self.basepath})"
+
+def load_template(template_path, basepath="/", asset_urls=None, image_sizes=None, minify=False):
+    with open(template_path) as template_file:
+        return Template(template_file.read(), basepath, asset_urls, image_sizes, minify)
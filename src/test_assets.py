@@ -0,0 +1,80 @@
+import os
+import unittest
+
+from assets import list_files, needs_copy, sync_static, fingerprint_path, load_asset_urls
+from fixtures import TempDirTestCase, write
+
+class TestAssets(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.output = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, "cache")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def test_list_files(self):
+        self.assertEqual(list_files(self.static), ["index.css", os.path.join("images", "tom.png")])
+
+    def test_sync_copies_then_skips(self):
+        copied, removed = sync_static(self.static, self.output, self.cache)
+        self.assertEqual(len(copied), 2)
+        self.assertEqual(removed, [])
+        copied, removed = sync_static(self.static, self.output, self.cache)
+        self.assertEqual(copied, [])
+
+    def test_sync_copies_changed(self):
+        sync_static(self.static, self.output, self.cache)
+        write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        copied, _ = sync_static(self.static, self.output, self.cache)
+        self.assertEqual(copied, ["index.css"])
+        with open(os.path.join(self.output, "index.css")) as f:
+            self.assertEqual(f.read(), "body { color: red; }")
+
+    def test_sync_removes_stale_keeps_pages(self):
+        sync_static(self.static, self.output, self.cache)
+        write(os.path.join(self.output, "index.html"), "<p>page</p>")
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        _, removed = sync_static(self.static, self.output, self.cache)
+        self.assertEqual(removed, [os.path.join("images", "tom.png")])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.output, "index.html")))
+
+    def test_needs_copy_checksum(self):
+        src = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.output, "index.css")
+        write(dest, "body {}")
+        # Same size and content but a different mtime
+        os.utime(dest, ns=(0, 0))
+        self.assertTrue(needs_copy(src, dest))
+        self.assertFalse(needs_copy(src, dest, checksum=True))
+
+    def test_fingerprint_path(self):
+        self.assertEqual(fingerprint_path(os.path.join("images", "tom.png"), "d96892db0123"), os.path.join("images", "tom.d96892db.png"))
+
+    def test_sync_fingerprinted(self):
+        copied, _ = sync_static(self.static, self.output, self.cache, fingerprint=True)
+        asset_urls = load_asset_urls(self.cache)
+        self.assertEqual(sorted(asset_urls), ["images/tom.png", "index.css"])
+        self.assertEqual(sorted(copied), sorted([os.path.normpath(url) for url in asset_urls.values()]))
+        self.assertFalse(os.path.exists(os.path.join(self.output, "index.css")))
+        old_css = asset_urls["index.css"]
+
+        # A changed file moves to a new name and its old copy is removed
+        write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        copied, removed = sync_static(self.static, self.output, self.cache, fingerprint=True)
+        new_css = load_asset_urls(self.cache)["index.css"]
+        self.assertNotEqual(new_css, old_css)
+        self.assertEqual(copied, [new_css])
+        self.assertEqual(removed, [old_css])
+        self.assertTrue(os.path.exists(os.path.join(self.output, new_css)))
+
+        # Turning fingerprinting off goes back to the plain names
+        sync_static(self.static, self.output, self.cache)
+        self.assertEqual(load_asset_urls(self.cache), {})
+        self.assertTrue(os.path.exists(os.path.join(self.output, "index.css")))
+        self.assertFalse(os.path.exists(os.path.join(self.output, new_css)))
+
+
+if __name__ == "__main__":
+    unittest.main()
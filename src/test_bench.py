@@ -0,0 +1,29 @@
+import tempfile
+import unittest
+
+from bench import CORPORA, generate_corpus, read_corpus, compare
+from conversions import markdown_to_html_node
+
+class TestBench(unittest.TestCase):
+    def test_corpus_is_reproducible(self):
+        for kind in CORPORA:
+            with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+                first_docs = read_corpus(generate_corpus(kind, first, 3, 7)[0])
+                second_docs = read_corpus(generate_corpus(kind, second, 3, 7)[0])
+                self.assertEqual(len(first_docs), 3)
+                self.assertEqual(first_docs, second_docs)
+
+    def test_corpus_parses(self):
+        for kind in CORPORA:
+            with tempfile.TemporaryDirectory() as root:
+                for document in read_corpus(generate_corpus(kind, root, 2, 1)[0]):
+                    markdown_to_html_node(document)
+
+    def test_compare(self):
+        baseline = {"links/to_html": 1.0, "lists/to_html": 1.0, "gone/to_html": 1.0}
+        results = {"links/to_html": 1.05, "lists/to_html": 1.5, "new/to_html": 9.0}
+        self.assertEqual(compare(results, baseline, 0.10), [("lists/to_html", 1.0, 1.5, 1.5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import io
+import os
+import tempfile
+import unittest
+
+from buildapi import build_site
+from filesystems import DiskFS, DictFS, ZipFS
+from main import generate_pages_recursive
+
+SITE = {
+    "template.html": "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}",
+    "static/index.css": "body {}",
+    "static/images/tom.png": b"\x89PNG",
+    "content/index.md": "# Home\n\n[Tom](/blog/tom)",
+    "content/blog/tom/index.md": "# Tom\n\n![Tom](/images/tom.png)",
+    "content/drafts/wip.md": "# WIP",
+    "content/notes.txt": "not a page",
+}
+
+class TestBuildApi(unittest.TestCase):
+    def test_build_in_memory(self):
+        output = DictFS()
+        results = build_site(DictFS(SITE), output, "/ssg/", ["drafts"])
+        self.assertEqual(sorted(results), ["blog/tom/index.html", "images/tom.png", "index.css", "index.html"])
+        self.assertEqual(
+            results["index.html"],
+            b"<title>Home</title><link href=\"/ssg/index.css\"><div><h1>Home</h1><p><a href=\"/ssg/blog/tom\">Tom</a></p></div>",
+        )
+        self.assertEqual(output.files, results)
+
+    def test_matches_disk_build(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = DiskFS(root)
+            for path, data in SITE.items():
+                source.write_bytes(path, data.encode() if isinstance(data, str) else data)
+            generate_pages_recursive("/ssg/", os.path.join(root, "content") + "/", os.path.join(root, "template.html"), os.path.join(root, "docs") + "/")
+            results = build_site(source, None, "/ssg/")
+            docs = DiskFS(os.path.join(root, "docs"))
+            for path in docs.list_files(""):
+                self.assertEqual(results[path], docs.read_bytes(path))
+
+    def test_zip_round_trip(self):
+        archive = io.BytesIO()
+        with ZipFS(archive, "w") as source:
+            for path, data in SITE.items():
+                source.write_bytes(path, data)
+        with ZipFS(archive) as source:
+            results = build_site(source, None, "/", ["drafts"])
+        self.assertEqual(results, build_site(DictFS(SITE), None, "/", ["drafts"]))
+
+    def test_failures_are_aggregated(self):
+        site = dict(SITE)
+        site["content/broken.md"] = "no title"
+        with self.assertRaises(Exception) as raised:
+            build_site(DictFS(site))
+        self.assertIn("content/broken.md", str(raised.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
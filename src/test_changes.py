@@ -0,0 +1,66 @@
+import json
+import os
+import unittest
+
+from changes import write_changes
+from incremental import hash_bytes, output_file
+from fixtures import TempDirTestCase, write
+
+class TestChanges(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, "cache")
+        self.changes = os.path.join(self.root, "changes.json")
+        write(os.path.join(self.output, "index.html"), "<p>home</p>")
+        write(os.path.join(self.output, "blog", "tom", "index.html"), "<p>tom</p>")
+
+    def test_output_file_skips_identical_writes(self):
+        path = os.path.join(self.output, "index.html")
+        os.utime(path, ns=(0, 0))
+        with output_file(path) as f:
+            f.write("<p>home</p>")
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        with output_file(path) as f:
+            f.write("<p>home again</p>")
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 0)
+        with open(path) as f:
+            self.assertEqual(f.read(), "<p>home again</p>")
+        self.assertEqual(os.listdir(self.output), ["blog", "index.html"])
+
+    def test_output_file_keeps_old_output_on_error(self):
+        path = os.path.join(self.output, "index.html")
+        with self.assertRaises(ValueError):
+            with output_file(path) as f:
+                f.write("<p>half")
+                raise ValueError("render failed")
+        with open(path) as f:
+            self.assertEqual(f.read(), "<p>home</p>")
+        self.assertEqual(sorted(os.listdir(self.output)), ["blog", "index.html"])
+
+    def test_write_changes(self):
+        changes = write_changes(self.output, self.cache, self.changes)
+        self.assertEqual(changes["added"], {
+            "blog/tom/index.html": hash_bytes(b"<p>tom</p>"),
+            "index.html": hash_bytes(b"<p>home</p>"),
+        })
+
+        write(os.path.join(self.output, "index.html"), "<p>new home</p>")
+        write(os.path.join(self.output, "contact", "index.html"), "<p>contact</p>")
+        os.remove(os.path.join(self.output, "blog", "tom", "index.html"))
+        write_changes(self.output, self.cache, self.changes)
+        with open(self.changes) as f:
+            self.assertEqual(json.load(f), {
+                "added": {"contact/index.html": hash_bytes(b"<p>contact</p>")},
+                "changed": {"index.html": hash_bytes(b"<p>new home</p>")},
+                "removed": ["blog/tom/index.html"],
+            })
+
+        # Rewriting the same bytes is not a change
+        write(os.path.join(self.output, "index.html"), "<p>new home</p>")
+        changes = write_changes(self.output, self.cache, self.changes)
+        self.assertEqual(changes, {"added": {}, "changed": {}, "removed": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
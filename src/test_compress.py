@@ -0,0 +1,54 @@
+import gzip
+import os
+import unittest
+
+from compress import compress_outputs, gzip_bytes
+from fixtures import TempDirTestCase, write
+
+class TestCompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output = self.root
+        write(os.path.join(self.output, "index.html"), "<p>hello</p>" * 50)
+        write(os.path.join(self.output, "index.css"), "body {}")
+        write(os.path.join(self.output, "images", "tom.png"), "png")
+
+    def test_gzip_bytes(self):
+        self.assertEqual(gzip.decompress(gzip_bytes(b"hello" * 100)), b"hello" * 100)
+        # No timestamp in the header, so the output is reproducible
+        self.assertEqual(gzip_bytes(b"hello"), gzip_bytes(b"hello"))
+
+    def test_compress_outputs(self):
+        compressed, removed = compress_outputs(self.output, 2)
+        self.assertEqual(compressed, ["index.css", "index.html"])
+        self.assertEqual(removed, [])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "images", "tom.png.gz")))
+        with gzip.open(os.path.join(self.output, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 50)
+
+    def test_skips_fresh_sidecars(self):
+        compress_outputs(self.output)
+        compressed, _ = compress_outputs(self.output)
+        self.assertEqual(compressed, [])
+        write(os.path.join(self.output, "index.css"), "body { color: red; }")
+        compressed, _ = compress_outputs(self.output)
+        self.assertEqual(compressed, ["index.css"])
+        with gzip.open(os.path.join(self.output, "index.css.gz"), "rt") as f:
+            self.assertEqual(f.read(), "body { color: red; }")
+
+    def test_removes_orphaned_sidecars(self):
+        compress_outputs(self.output)
+        os.remove(os.path.join(self.output, "index.css"))
+        _, removed = compress_outputs(self.output)
+        self.assertEqual(removed, ["index.css.gz"])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "index.css.gz")))
+
+    def test_keeps_static_gz_files(self):
+        write(os.path.join(self.output, "downloads", "notes.txt.gz"), gzip_bytes(b"notes"))
+        _, removed = compress_outputs(self.output)
+        self.assertEqual(removed, [])
+        self.assertTrue(os.path.exists(os.path.join(self.output, "downloads", "notes.txt.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
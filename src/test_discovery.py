@@ -0,0 +1,31 @@
+import os
+import unittest
+
+from discovery import discover_pages
+from fixtures import TempDirTestCase, write
+
+class TestDiscovery(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content") + "/"
+        self.docs = os.path.join(self.root, "docs") + "/"
+        for path in ["index.md", "blog/b/index.md", "blog/a/index.md", "blog-a.md", "notes.txt", ".drafts/x.md"]:
+            write(self.content + path, "# Page")
+
+    def test_discover_pages(self):
+        pages = discover_pages(self.content, self.docs, [".*"])
+        self.assertEqual(list(pages), [
+            self.content + "blog-a.md",
+            self.content + "blog/a/index.md",
+            self.content + "blog/b/index.md",
+            self.content + "index.md",
+        ])
+        page = pages[self.content + "blog/a/index.md"]
+        self.assertEqual(page["dest"], self.docs + "blog/a/index.html")
+        self.assertEqual(page["size"], len("# Page"))
+        self.assertEqual(page["mtime_ns"], os.stat(self.content + "blog/a/index.md").st_mtime_ns)
+        self.assertIn(self.content + ".drafts/x.md", discover_pages(self.content, self.docs))
+
+
+if __name__ == "__main__":
+    unittest.main()
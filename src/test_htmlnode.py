@@ -1,7 +1,9 @@
+import copy
+import pickle
 import unittest
 
-from htmlnode import BlockType, HTMLNode, LeafNode, ParentNode
-from conversions import markdown_to_blocks, block_to_block_type, markdown_to_html_node, extract_title
+from htmlnode import BlockType, HTMLNode, LeafNode, ParentNode, NodeArena
+from conversions import markdown_to_blocks, block_to_block_type, markdown_to_html_node, extract_title, scan_blocks, parse_markdown, StreamedDocument, inline_cache_info, clear_inline_cache, set_inline_cache_size, INLINE_CACHE_SIZE
 
 class TestHTMLNode(unittest.TestCase):
     def test_eq(self):
@@ -60,6 +62,41 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><span><span><span><b>greatgreatgreatgrandchild</b></span></span></span></span></div>"
         )
 
+    def test_render_into_streams_fragments(self):
+        parent_node = ParentNode("div", [LeafNode("b", "bold"), ParentNode("span", [LeafNode(None, "text")])])
+        fragments = []
+        parent_node.render_into(fragments.append)
+        self.assertEqual(fragments, ["<div>", "<b>bold</b>", "<span>", "text", "</span>", "</div>"])
+        self.assertEqual("".join(fragments), parent_node.to_html())
+
+    def test_html_node_to_html_not_implemented(self):
+        node = HTMLNode("p", "text")
+        with self.assertRaises(NotImplementedError):
+            node.to_html()
+
+    def test_nodes_have_no_dict(self):
+        self.assertFalse(hasattr(LeafNode("b", "bold"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("div", []), "__dict__"))
+
+    def test_arena_round_trip(self):
+        parent_node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "See "), LeafNode("a", "Tom", {"href": "/blog/tom"})]),
+            ParentNode("ul", []),
+            ParentNode("blockquote", [ParentNode("span", [LeafNode("b", "deep")])]),
+            LeafNode("img", "", {"src": "/tom.png", "alt": "Tom"}),
+        ])
+        arena = NodeArena.from_node(parent_node)
+        self.assertEqual(len(arena), 9)
+        self.assertEqual(arena.to_html(), parent_node.to_html())
+        self.assertEqual(arena.to_node().to_html(), parent_node.to_html())
+
+    def test_arena_deep_document(self):
+        node = LeafNode("b", "bottom")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        arena = NodeArena.from_node(node)
+        self.assertEqual(arena.to_html(), "<span>" * 5000 + "<b>bottom</b>" + "</span>" * 5000)
+
     def test_markdown_to_blocks(self):
         md = """
 This is **bolded** paragraph
@@ -103,6 +140,44 @@ Check out this link, too: [And Here!](www.google.com)
             ],
         )
     
+    def test_markdown_to_blocks_blank_runs(self):
+        md = "\n\n\n\n# Title\n\n\n\n\n  para one\n  line two  \n\n   \n\n- a\n- b\n\n\n"
+        self.assertEqual(markdown_to_blocks(md), ["# Title", "para one\n  line two", "- a\n- b"])
+
+    def test_only_newlines_split_lines(self):
+        # Unicode line and paragraph separators and form feeds are text
+        md = "# T\n\nline one\u2028\u2028line two\n\ntext\x0cmore"
+        self.assertEqual(markdown_to_blocks(md), ["# T", "line one\u2028\u2028line two", "text\x0cmore"])
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><h1>T</h1><p>line one\u2028\u2028line two</p><p>text\x0cmore</p></div>",
+        )
+        self.assertEqual(extract_title("# T\u2028more"), "T\u2028more")
+        # The same lines the streaming path reads from a file
+        fragments = []
+        StreamedDocument(lambda: iter(md.split("\n"))).render_into(fragments.append)
+        self.assertEqual("".join(fragments), markdown_to_html_node(md).to_html())
+
+    def test_scan_blocks(self):
+        md = "# Title\n\n- a\n- b\n\n1. one\n2. two\n\n> quote\n\n```\ncode\n```\n\nplain"
+        self.assertEqual(
+            list(scan_blocks(md.splitlines())),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.UNORDERED_LIST, ["- a", "- b"]),
+                (BlockType.ORDERED_LIST, ["1. one", "2. two"]),
+                (BlockType.QUOTE, ["> quote"]),
+                (BlockType.CODE, ["```", "code", "```"]),
+                (BlockType.PARAGRAPH, ["plain"]),
+            ],
+        )
+
+    def test_scan_blocks_many_lists(self):
+        md = "\n\n".join(f"- item {i}\n- item {i} again" for i in range(2000))
+        blocks = list(scan_blocks(md.splitlines()))
+        self.assertEqual(len(blocks), 2000)
+        self.assertTrue(all(block_type == BlockType.UNORDERED_LIST for block_type, _ in blocks))
+
     def test_block_to_block_type_1(self):
         md = """
 
@@ -316,6 +391,70 @@ CHECKING
             "<div><ol><li>List 1 Item 1</li><li>List 1 Item 2</li><li>List 1 Item 3</li></ol><ol><li>List 2 Item 1</li><li>List 2 Item 2 with <b>bold</b> text</li></ol><ol><li>List 3 is only 1 item</li></ol></div>",
         )
     
+    def test_parse_markdown_metadata(self):
+        md = """
+Intro with ![first](/images/a.png) and ![second](/images/b.png)
+
+# The **Title**
+
+## Section [one](/one)
+
+- words in a list
+"""
+        result = parse_markdown(md)
+        self.assertEqual(result.node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertEqual(result.title, "The **Title**")
+        self.assertEqual(result.headings, [(1, "The Title"), (2, "Section one")])
+        self.assertEqual(result.first_image, ("/images/a.png", "first"))
+        self.assertEqual(result.word_count, 11)
+
+    def test_parse_markdown_missing_title(self):
+        result = parse_markdown("## Only a subheading")
+        self.assertEqual(result.title, None)
+        with self.assertRaises(Exception):
+            result.require_title()
+
+    def test_inline_cache_shares_leaves(self):
+        clear_inline_cache()
+        md = "- [Home](/)\n- [Blog](/blog)\n\n- [Home](/)"
+        node = markdown_to_html_node(md)
+        info = inline_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+        first_home = node.children[0].children[0].children[0]
+        second_home = node.children[1].children[0].children[0]
+        self.assertIs(first_home, second_home)
+        with self.assertRaises(TypeError):
+            first_home.props["href"] = "/elsewhere"
+        self.assertEqual(node.to_html(), "<div><ul><li><a href=\"/\">Home</a></li><li><a href=\"/blog\">Blog</a></li></ul><ul><li><a href=\"/\">Home</a></li></ul></div>")
+
+    def test_parsed_tree_pickles_and_copies(self):
+        node = markdown_to_html_node("# T\n\n[a](/b) ![c](/d.png)")
+        for copied in (pickle.loads(pickle.dumps(node)), copy.deepcopy(node)):
+            self.assertEqual(copied.to_html(), node.to_html())
+        link = pickle.loads(pickle.dumps(node)).children[1].children[0]
+        with self.assertRaises(TypeError):
+            link.props["href"] = "/elsewhere"
+
+    def test_inline_cache_is_bounded(self):
+        set_inline_cache_size(2)
+        try:
+            markdown_to_html_node("one\n\ntwo\n\nthree\n\nfour")
+            self.assertEqual(inline_cache_info().currsize, 2)
+        finally:
+            set_inline_cache_size(INLINE_CACHE_SIZE)
+
+    def test_streamed_document(self):
+        md = "# Title\n\nSome **bold** text\n\n- a\n- b"
+        opened = []
+        def open_lines():
+            opened.append(True)
+            return iter(md.splitlines())
+        document = StreamedDocument(open_lines)
+        fragments = []
+        document.render_into(fragments.append)
+        self.assertEqual(len(opened), 1)
+        self.assertEqual("".join(fragments), markdown_to_html_node(md).to_html())
+
     def test_extract_title_1(self):
         md = "# Hello"
         title = extract_title(md)
@@ -0,0 +1,45 @@
+import os
+import struct
+import unittest
+
+from images import read_image_size, load_image_sizes
+from fixtures import TempDirTestCase, write
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x06\x00\x00\x00"
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 8
+# SOI, an APP0 segment to skip, fill bytes, then a baseline start of frame
+JPEG = (
+    b"\xff\xd8"
+    + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    + b"\xff\xff\xc0" + struct.pack(">HBHH", 17, 8, 200, 300) + b"\x00" * 10
+)
+
+class TestImages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.cache = os.path.join(self.root, "cache")
+        write(os.path.join(self.static, "images", "a.png"), PNG)
+        write(os.path.join(self.static, "images", "b.gif"), GIF)
+        write(os.path.join(self.static, "c.jpg"), JPEG)
+        write(os.path.join(self.static, "images", "broken.png"), b"not an image")
+        write(os.path.join(self.static, "index.css"), b"body {}")
+
+    def test_read_image_size(self):
+        self.assertEqual(read_image_size(os.path.join(self.static, "images", "a.png")), (640, 480))
+        self.assertEqual(read_image_size(os.path.join(self.static, "images", "b.gif")), (32, 16))
+        self.assertEqual(read_image_size(os.path.join(self.static, "c.jpg")), (300, 200))
+        self.assertEqual(read_image_size(os.path.join(self.static, "images", "broken.png")), None)
+
+    def test_load_image_sizes(self):
+        expected = {"images/a.png": (640, 480), "images/b.gif": (32, 16), "c.jpg": (300, 200)}
+        self.assertEqual(load_image_sizes(self.static, self.cache), expected)
+        # Served from the cache the second time round
+        self.assertEqual(load_image_sizes(self.static, self.cache), expected)
+
+        write(os.path.join(self.static, "images", "a.png"), PNG.replace(struct.pack(">II", 640, 480), struct.pack(">II", 64, 48)))
+        self.assertEqual(load_image_sizes(self.static, self.cache)["images/a.png"], (64, 48))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import unittest
+
+from incremental import hash_bytes, hash_file, page_entry, load_manifest, save_manifest, needs_rebuild, remove_output
+from fixtures import TempDirTestCase
+
+class TestIncremental(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+
+    def test_hash_file(self):
+        path = os.path.join(self.root, "page.md")
+        with open(path, "wb") as f:
+            f.write(b"# Hello")
+        self.assertEqual(hash_file(path), hash_bytes(b"# Hello"))
+
+    def test_manifest_round_trip(self):
+        pages = {"./content/index.md": page_entry("a", "b", "/", "./docs/index.html")}
+        save_manifest(self.root, pages)
+        self.assertEqual(load_manifest(self.root), pages)
+        self.assertEqual(load_manifest(self.root, "assets.json"), {})
+
+    def test_missing_manifest(self):
+        self.assertEqual(load_manifest(os.path.join(self.root, "nope")), {})
+
+    def test_corrupt_manifest(self):
+        with open(os.path.join(self.root, "pages.json"), "w") as f:
+            f.write("{not json")
+        self.assertEqual(load_manifest(self.root), {})
+
+    def test_needs_rebuild(self):
+        dest = os.path.join(self.root, "index.html")
+        entry = page_entry("a", "b", "/", dest)
+        self.assertTrue(needs_rebuild(None, entry))
+        # Unchanged inputs still rebuild when the output has gone missing
+        self.assertTrue(needs_rebuild(entry, entry))
+        open(dest, "w").close()
+        self.assertFalse(needs_rebuild(entry, entry))
+        self.assertTrue(needs_rebuild(entry, page_entry("a", "b", "/ssg/", dest)))
+        self.assertTrue(needs_rebuild(entry, page_entry("a", "c", "/", dest)))
+
+    def test_remove_output_prunes_empty_dirs(self):
+        nested = os.path.join(self.root, "blog", "tom")
+        os.makedirs(nested)
+        dest = os.path.join(nested, "index.html")
+        open(dest, "w").close()
+        remove_output(dest, self.root)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+        self.assertTrue(os.path.isdir(self.root))
+
+
+if __name__ == "__main__":
+    unittest.main()
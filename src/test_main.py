@@ -0,0 +1,254 @@
+import os
+import shutil
+import tracemalloc
+import unittest
+
+from main import find_pages, generate_pages, generate_pages_recursive, generate_pages_incremental
+import main
+import conversions
+import parsecache
+from parsecache import ParseCache
+from report import BuildReport
+from fixtures import TempDirTestCase, read, write
+
+TEMPLATE = "<title>{{ Title }}</title><link href=\"/index.css\"><main>{{ Content }}</main>"
+
+class TestMain(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content") + "/"
+        self.docs = os.path.join(self.root, "docs") + "/"
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, TEMPLATE)
+        write(self.content + "index.md", "# Home\n\n[Tom](/blog/tom)")
+        write(self.content + "blog/tom/index.md", "# Tom\n\nHe is **merry**.")
+        write(self.content + "notes.txt", "not a page")
+
+    def test_find_pages(self):
+        self.assertEqual(
+            sorted(find_pages(self.content, self.docs)),
+            [
+                (self.content + "blog/tom/index.md", self.docs + "blog/tom/index.html"),
+                (self.content + "index.md", self.docs + "index.html"),
+            ],
+        )
+
+    def test_find_pages_ignore(self):
+        write(self.content + "drafts/wip.md", "# WIP")
+        write(self.content + "blog/tom/notes.md", "# Notes")
+        pages = list(find_pages(self.content, self.docs, ["drafts", "blog/*/notes.md"]))
+        self.assertEqual([source for source, _ in pages], [self.content + "blog/tom/index.md", self.content + "index.md"])
+
+    def test_incremental_reuses_hashes_of_untouched_sources(self):
+        cache = os.path.join(self.root, "cache")
+        generate_pages_incremental("/", self.content, self.template, self.docs, cache)
+        hashed = []
+        hash_file = main.hash_file
+        def record(path):
+            hashed.append(path)
+            return hash_file(path)
+        main.hash_file = record
+        try:
+            write(self.content + "index.md", "# Home again")
+            generate_pages_incremental("/", self.content, self.template, self.docs, cache)
+        finally:
+            main.hash_file = hash_file
+        self.assertIn(self.content + "index.md", hashed)
+        self.assertNotIn(self.content + "blog/tom/index.md", hashed)
+        self.assertEqual(read(self.docs + "index.html"), "<title>Home again</title><link href=\"/index.css\"><main><div><h1>Home again</h1></div></main>")
+
+    def test_incremental_build_keeps_previous_output(self):
+        # build() works on ./static, ./content and ./docs like the CLI does
+        write(os.path.join(self.root, "static", "index.css"), "body {}")
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+        args = main.parse_args(["--incremental"])
+        main.build(args)
+
+        # Only the edited page is written again, untouched outputs stay put
+        write(self.content + "index.md", "# Home again")
+        rendered = []
+        generate_page, rewrap_page = main.generate_page, main.rewrap_page
+        def record_generate(basepath, from_path, template_path, dest_path, *args):
+            rendered.append(os.path.relpath(dest_path, self.docs))
+            return generate_page(basepath, from_path, template_path, dest_path, *args)
+        def record_rewrap(template, body, dest_path):
+            rendered.append(os.path.relpath(dest_path, self.docs))
+            return rewrap_page(template, body, dest_path)
+        main.generate_page, main.rewrap_page = record_generate, record_rewrap
+        try:
+            main.build(args)
+        finally:
+            main.generate_page, main.rewrap_page = generate_page, rewrap_page
+        self.assertEqual(rendered, ["index.html"])
+        self.assertEqual(read(self.docs + "blog/tom/index.html"), "<title>Tom</title><link href=\"/index.css\"><main><div><h1>Tom</h1><p>He is <b>merry</b>.</p></div></main>")
+
+    def test_generate_pages_recursive(self):
+        generate_pages_recursive("/ssg/", self.content, self.template, self.docs)
+        self.assertEqual(
+            read(self.docs + "index.html"),
+            "<title>Home</title><link href=\"/ssg/index.css\"><main><div><h1>Home</h1><p><a href=\"/ssg/blog/tom\">Tom</a></p></div></main>",
+        )
+        self.assertEqual(
+            read(self.docs + "blog/tom/index.html"),
+            "<title>Tom</title><link href=\"/ssg/index.css\"><main><div><h1>Tom</h1><p>He is <b>merry</b>.</p></div></main>",
+        )
+
+    def test_parallel_matches_serial(self):
+        pages = sorted(find_pages(self.content, self.docs))
+        self.assertEqual(generate_pages("/", pages, self.template, 1), {})
+        serial = [read(dest) for _, dest in pages]
+        self.assertEqual(generate_pages("/", pages, self.template, 2), {})
+        self.assertEqual([read(dest) for _, dest in pages], serial)
+
+    def test_report_matches_plain_build(self):
+        # Non-ASCII text makes characters and bytes differ
+        write(self.content + "blog/goldberry/index.md", "# Goldberry\n\nRiver\u2014daughter.")
+        pages = sorted(find_pages(self.content, self.docs))
+        generate_pages("/", pages, self.template)
+        plain = [read(dest) for _, dest in pages]
+        report = BuildReport()
+        self.assertEqual(generate_pages("/", pages, self.template, 1, report), {})
+        self.assertEqual([read(dest) for _, dest in pages], plain)
+        self.assertEqual(sorted([p["source"] for p in report.pages]), [source for source, _ in pages])
+        self.assertEqual(list(report.pages[0]["phases"]), ["read", "parse", "to_html", "template", "write"])
+        for page in report.pages:
+            self.assertEqual(page["bytes_out"], os.path.getsize(dict(pages)[page["source"]]))
+        tracemalloc.stop()
+
+    def test_report_keeps_code_untouched(self):
+        write(self.content + "index.md", "# Home\n\n```\n<a href=\"/x\">x</a> <img src=\"/images/tom.png\">\n```\n\n![Tom](/images/tom.png)")
+        pages = sorted(find_pages(self.content, self.docs))
+        image_sizes = {"images/tom.png": (64, 48)}
+        generate_pages("/ssg/", pages, self.template, image_sizes=image_sizes)
+        plain = [read(dest) for _, dest in pages]
+        self.assertEqual(generate_pages("/ssg/", pages, self.template, 1, BuildReport(), image_sizes=image_sizes), {})
+        self.assertEqual([read(dest) for _, dest in pages], plain)
+        tracemalloc.stop()
+
+    def test_streaming_matches_plain_build(self):
+        pages = sorted(find_pages(self.content, self.docs))
+        generate_pages("/ssg/", pages, self.template)
+        plain = [read(dest) for _, dest in pages]
+        self.assertEqual(generate_pages("/ssg/", pages, self.template, 1, stream_threshold=0), {})
+        self.assertEqual([read(dest) for _, dest in pages], plain)
+
+    def test_streaming_missing_title(self):
+        write(self.content + "broken.md", "no title here")
+        failures = generate_pages("/", [(self.content + "broken.md", self.docs + "broken.html")], self.template, 1, stream_threshold=0)
+        self.assertEqual(failures, {self.content + "broken.md": "Exception: h1 heading / title missing"})
+        self.assertFalse(os.path.exists(self.docs + "broken.html"))
+
+    def test_fingerprinted_asset_urls(self):
+        write(self.content + "index.md", "# Home\n\n![Tom](/images/tom.png) and [css](/index.css?v=1)")
+        pages = [(self.content + "index.md", self.docs + "index.html")]
+        asset_urls = {"index.css": "index.0123abcd.css", "images/tom.png": "images/tom.4567cdef.png"}
+        self.assertEqual(generate_pages("/ssg/", pages, self.template, 1, asset_urls=asset_urls), {})
+        self.assertEqual(
+            read(self.docs + "index.html"),
+            "<title>Home</title><link href=\"/ssg/index.0123abcd.css\"><main><div><h1>Home</h1>"
+            "<p><img src=\"/ssg/images/tom.4567cdef.png\" alt=\"Tom\"></img> and <a href=\"/ssg/index.0123abcd.css?v=1\">css</a></p></div></main>",
+        )
+
+    def test_template_change_rewraps_cached_bodies(self):
+        cache = os.path.join(self.root, "cache")
+        generate_pages_incremental("/ssg/", self.content, self.template, self.docs, cache)
+        write(self.template, "<h2>{{ Title }}</h2><link href=\"/index.css\">{{ Content }}")
+
+        # Neither the whole-page parser nor the per-block one may run
+        patched = [(conversions, conversions.lines_to_html_node), (parsecache, parsecache.lines_to_html_node)]
+        def fail(*args):
+            raise AssertionError("page parsed again")
+        for module, _ in patched:
+            module.lines_to_html_node = fail
+        try:
+            generate_pages_incremental("/ssg/", self.content, self.template, self.docs, cache)
+        finally:
+            for module, original in patched:
+                module.lines_to_html_node = original
+        self.assertEqual(
+            read(self.docs + "index.html"),
+            "<h2>Home</h2><link href=\"/ssg/index.css\"><div><h1>Home</h1><p><a href=\"/ssg/blog/tom\">Tom</a></p></div>",
+        )
+
+        # A page whose source also changed is parsed as usual
+        write(self.content + "blog/tom/index.md", "# Tom\n\nHe is **old**.")
+        write(self.template, "<h3>{{ Title }}</h3>{{ Content }}")
+        generate_pages_incremental("/ssg/", self.content, self.template, self.docs, cache)
+        self.assertEqual(read(self.docs + "blog/tom/index.html"), "<h3>Tom</h3><div><h1>Tom</h1><p>He is <b>old</b>.</p></div>")
+
+    def test_incremental_matches_full_build_for_urls_in_code(self):
+        # Markup inside a code block is text: its URLs are never rewritten
+        # and a fake img neither gets hints nor takes the first image slot
+        write(self.content + "index.md", "# Home\n\n```\n<a href=\"/x\">x</a> <img src=\"/images/tom.png\">\n```\n\n![Tom](/images/tom.png)")
+        pages = sorted(find_pages(self.content, self.docs))
+        image_sizes = {"images/tom.png": (64, 48)}
+        cache = os.path.join(self.root, "cache")
+
+        def full_build():
+            generate_pages("/ssg/", pages, self.template, image_sizes=image_sizes)
+            return [read(dest) for _, dest in pages]
+
+        full = full_build()
+        self.assertIn("<code><a href=\"/x\">x</a> <img src=\"/images/tom.png\">\n</code>", full[1])
+        self.assertIn("<img src=\"/ssg/images/tom.png\" alt=\"Tom\" width=\"64\" height=\"48\"></img>", full[1])
+        generate_pages_incremental("/ssg/", self.content, self.template, self.docs, cache, image_sizes=image_sizes)
+        self.assertEqual([read(dest) for _, dest in pages], full)
+
+        # Re-wrapped from the body cache after a template change
+        write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        generate_pages_incremental("/ssg/", self.content, self.template, self.docs, cache, image_sizes=image_sizes)
+        rewrapped = [read(dest) for _, dest in pages]
+        self.assertEqual(rewrapped, full_build())
+
+    def test_incremental_minify_matches_full_build(self):
+        # Whitespace inside attribute values is part of the value
+        write(self.content + "index.md", "# Home\n\n![alt  two](/images/tom.png)   and\n  more")
+        pages = sorted(find_pages(self.content, self.docs))
+        generate_pages("/", pages, self.template, minify=True)
+        full = [read(dest) for _, dest in pages]
+        self.assertIn("alt=\"alt  two\"", full[1])
+        self.assertIn("</img> and more", full[1])
+        generate_pages_incremental("/", self.content, self.template, self.docs, os.path.join(self.root, "cache"), minify=True)
+        self.assertEqual([read(dest) for _, dest in pages], full)
+
+    def test_incremental_uses_parse_cache(self):
+        cache = os.path.join(self.root, "cache")
+        parse_cache = ParseCache(cache)
+        generate_pages_incremental("/", self.content, self.template, self.docs, cache, parse_cache=parse_cache)
+        self.assertEqual(len(parse_cache.entries()), 2)
+
+        # An edit reparses the changed blocks only, never the whole page
+        write(self.content + "index.md", "# Home again\n\n[Tom](/blog/tom)")
+        generate_pages_incremental("/", self.content, self.template, self.docs, cache, parse_cache=parse_cache)
+        self.assertEqual(len(parse_cache.entries()), 2)
+
+        # Reverted with the fragment store gone, the page comes back from
+        # the parse cache without parsing anything
+        shutil.rmtree(os.path.join(cache, "fragments"))
+        write(self.content + "index.md", "# Home\n\n[Tom](/blog/tom)")
+        lines_to_html_node = conversions.lines_to_html_node
+        def fail(*args):
+            raise AssertionError("page parsed again")
+        conversions.lines_to_html_node = fail
+        try:
+            generate_pages_incremental("/", self.content, self.template, self.docs, cache, parse_cache=parse_cache)
+        finally:
+            conversions.lines_to_html_node = lines_to_html_node
+        self.assertEqual(read(self.docs + "index.html"), "<title>Home</title><link href=\"/index.css\"><main><div><h1>Home</h1><p><a href=\"/blog/tom\">Tom</a></p></div></main>")
+
+    def test_failures_are_aggregated(self):
+        write(self.content + "broken.md", "no title here")
+        write(self.content + "also_broken.md", "**unclosed")
+        pages = sorted(find_pages(self.content, self.docs))
+        failures = generate_pages("/", pages, self.template, 2)
+        self.assertEqual(sorted(failures), [self.content + "also_broken.md", self.content + "broken.md"])
+        # The good pages were still written
+        self.assertTrue(os.path.exists(self.docs + "index.html"))
+        with self.assertRaises(Exception):
+            generate_pages_recursive("/", self.content, self.template, self.docs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import unittest
+
+from conversions import parse_markdown
+import parsecache
+from parsecache import ParseCache, BodyCache, FragmentCache, parse_cached
+from htmlnode import ArenaDocument
+from fixtures import TempDirTestCase
+
+MD = """# Title with [a link](/home)
+
+![first](/images/a.png)
+
+- one
+- two
+
+```
+code
+```
+"""
+
+class TestParseCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ParseCache(self.root)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.cache.get(MD), None)
+        expected = parse_markdown(MD)
+        self.cache.put(MD, expected)
+        cached = self.cache.get(MD)
+        self.assertEqual(cached.node.to_html(), expected.node.to_html())
+        self.assertEqual(cached.title, expected.title)
+        self.assertEqual(cached.headings, expected.headings)
+        self.assertEqual(cached.word_count, expected.word_count)
+        self.assertEqual(cached.first_image, expected.first_image)
+
+    def test_parse_cached(self):
+        first = parse_cached(MD, self.cache)
+        self.assertEqual(len(self.cache.entries()), 1)
+        second = parse_cached(MD, self.cache)
+        self.assertEqual(second.node.to_html(), first.node.to_html())
+        self.assertEqual(parse_cached(MD).node.to_html(), first.node.to_html())
+
+    def test_corrupt_entry_is_a_miss(self):
+        path = self.cache.path_for(self.cache.key(MD))
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"\x00garbage")
+        self.assertEqual(self.cache.get(MD), None)
+
+    def test_evict_oldest_first(self):
+        documents = [f"# Page {i}\n\n" + "words " * 200 for i in range(4)]
+        for i, document in enumerate(documents):
+            self.cache.put(document, parse_markdown(document))
+            os.utime(self.cache.path_for(self.cache.key(document)), ns=(i, i))
+        # Reading the oldest entry makes it the most recently used
+        self.cache.get(documents[0])
+        entry_size = self.cache.entries()[0][1]
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertNotEqual(self.cache.get(documents[0]), None)
+        self.assertNotEqual(self.cache.get(documents[3]), None)
+        self.assertEqual(self.cache.get(documents[1]), None)
+
+
+class TestBodyCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = BodyCache(self.root)
+
+    def test_put_get_prune(self):
+        self.assertEqual(self.cache.get("a"), None)
+        self.cache.put("a", "Home", ArenaDocument.from_node(parse_markdown("# Home").node))
+        self.cache.put("b", "Tom", ArenaDocument.from_node(parse_markdown("# Tom").node))
+        title, document = self.cache.get("a")
+        self.assertEqual((title, document.to_html()), ("Home", "<div><h1>Home</h1></div>"))
+        self.assertEqual(self.cache.prune(["a"]), 1)
+        self.assertEqual(self.cache.get("b"), None)
+        self.assertNotEqual(self.cache.get("a"), None)
+
+
+class TestFragmentCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = FragmentCache(self.root)
+
+    def render_counting(self, md, parse_cache=None):
+        rendered = []
+        lines_to_html_node = parsecache.lines_to_html_node
+        def count(lines, block_type):
+            rendered.append(lines)
+            return lines_to_html_node(lines, block_type)
+        parsecache.lines_to_html_node = count
+        try:
+            return self.cache.render("page.md", md, parse_cache), rendered
+        finally:
+            parsecache.lines_to_html_node = lines_to_html_node
+
+    def test_render_matches_full_parse(self):
+        (title, document), rendered = self.render_counting(MD)
+        self.assertEqual(title, "Title with [a link](/home)")
+        self.assertEqual(document.to_html(), parse_markdown(MD).node.to_html())
+        self.assertEqual(len(rendered), 4)
+
+    def test_only_changed_blocks_rerender(self):
+        self.render_counting(MD)
+        edited = MD.replace("- two", "- two\n- three")
+        (_, document), rendered = self.render_counting(edited)
+        self.assertEqual(document.to_html(), parse_markdown(edited).node.to_html())
+        self.assertEqual(rendered, [["- one", "- two", "- three"]])
+
+    def test_misses_go_through_parse_cache(self):
+        parse_cache = ParseCache(self.root)
+        parse_cache.put(MD, parse_markdown(MD))
+        (title, document), rendered = self.render_counting(MD, parse_cache)
+        self.assertEqual(title, "Title with [a link](/home)")
+        self.assertEqual(document.to_html(), parse_markdown(MD).node.to_html())
+        self.assertEqual(rendered, [])
+
+    def test_edit_with_parse_cache_parses_changed_block_only(self):
+        parse_cache = ParseCache(self.root)
+        self.render_counting(MD, parse_cache)
+        edited = MD.replace("- two", "- two\n- three")
+        parsed = []
+        parse_markdown = parsecache.parse_markdown
+        def count(md):
+            parsed.append(md)
+            return parse_markdown(md)
+        parsecache.parse_markdown = count
+        try:
+            (_, document), rendered = self.render_counting(edited, parse_cache)
+        finally:
+            parsecache.parse_markdown = parse_markdown
+        self.assertEqual(document.to_html(), parse_markdown(edited).node.to_html())
+        self.assertEqual(rendered, [["- one", "- two", "- three"]])
+        self.assertEqual(parsed, [])
+
+    def test_prune(self):
+        self.cache.render("a.md", "# A")
+        self.cache.render("b.md", "# B")
+        self.assertEqual(self.cache.prune(["a.md"]), 1)
+        self.assertEqual(self.cache.get("b.md"), {})
+        self.assertEqual(len(self.cache.get("a.md")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from report import PageTimer, BuildReport
+
+def page(source, total, parse):
+    return {"source": source, "total": total, "phases": {"read": 0.0, "parse": parse}, "bytes_in": 10, "bytes_out": 20, "peak_bytes": None}
+
+class TestReport(unittest.TestCase):
+    def test_page_timer(self):
+        timer = PageTimer("./content/index.md")
+        timer.lap("read")
+        timer.lap("parse")
+        stats = timer.finish()
+        self.assertEqual(list(stats["phases"]), ["read", "parse"])
+        self.assertGreaterEqual(stats["total"], sum(stats["phases"].values()) - 1e-9)
+
+    def test_build_report(self):
+        report = BuildReport()
+        report.add(page("b.md", 0.2, 0.15))
+        report.add(page("a.md", 0.1, 0.05))
+        report.add(page("c.md", 0.3, 0.25))
+        self.assertEqual([p["source"] for p in report.slowest(2)], ["c.md", "b.md"])
+        data = report.to_dict()
+        self.assertEqual(data["page_count"], 3)
+        self.assertAlmostEqual(data["phase_totals"]["parse"], 0.45)
+        self.assertEqual(data["bytes_out"], 60)
+        self.assertEqual([p["source"] for p in data["pages"]], ["a.md", "b.md", "c.md"])
+        summary = report.summary(1)
+        self.assertIn("Slowest 1 page(s):", summary)
+        self.assertIn("c.md", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import unittest
+
+from main import find_pages, generate_pages_recursive
+from shard import parse_shard, shard_of, select_shard, merge_shards
+from fixtures import TempDirTestCase, read, write
+
+class TestShard(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content") + "/"
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        for index in range(12):
+            write(self.content + f"page{index}/index.md", f"# Page {index}")
+
+    def build_shard(self, shard):
+        dest = os.path.join(self.root, f"shard{shard[0]}") + "/"
+        generate_pages_recursive("/", self.content, self.template, dest, shard=shard)
+        return dest
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ["0/4", "5/4", "1/0", "a/b", "3"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+    def test_partition_is_stable_and_complete(self):
+        self.assertEqual(shard_of("blog/tom/index.md", 4), shard_of("blog/tom/index.md", 4))
+        pages = list(find_pages(self.content, "docs/"))
+        shards = [select_shard(pages, self.content, (index, 3)) for index in range(1, 4)]
+        self.assertEqual(sorted(sum(shards, [])), pages)
+        # Only the path under the content dir counts, not where it lives
+        moved = [(os.path.join("elsewhere", os.path.relpath(source, self.content)), dest) for source, dest in pages]
+        self.assertEqual(len(select_shard(moved, "elsewhere", (1, 3))), len(shards[0]))
+
+    def test_merge(self):
+        shard_dirs = [self.build_shard((index, 2)) for index in (1, 2)]
+        output = os.path.join(self.root, "docs")
+        merged = merge_shards(shard_dirs, self.static, output)
+        self.assertEqual(len(merged), 12)
+        self.assertEqual(read(os.path.join(output, "page7", "index.html")), "<title>Page 7</title><div><h1>Page 7</h1></div>")
+        self.assertTrue(os.path.exists(os.path.join(output, "index.css")))
+        self.assertFalse(os.path.exists(os.path.join(output, ".shard.json")))
+
+    def test_merge_into_a_shard_dir(self):
+        # Shard builds write to ./docs, so one of them is usually the output
+        shard_dirs = [self.build_shard((index, 2)) for index in (1, 2)]
+        merged = merge_shards(shard_dirs, self.static, shard_dirs[0])
+        self.assertEqual(len(merged), 12)
+        for index in range(12):
+            self.assertEqual(read(os.path.join(shard_dirs[0], f"page{index}", "index.html")), f"<title>Page {index}</title><div><h1>Page {index}</h1></div>")
+        self.assertFalse(os.path.exists(os.path.join(shard_dirs[0], ".shard.json")))
+        self.assertEqual(sorted(os.listdir(self.root)), ["content", "shard1", "shard2", "static", "template.html"])
+
+    def test_merge_rejects_bad_shards(self):
+        first = self.build_shard((1, 2))
+        output = os.path.join(self.root, "docs")
+        with self.assertRaises(ValueError):
+            merge_shards([first], self.static, output)
+        second = self.build_shard((2, 2))
+        with self.assertRaises(ValueError):
+            merge_shards([first, first], self.static, output)
+        page = next(os.path.join(dir_path, name) for dir_path, _, names in os.walk(second) for name in names if name.endswith(".html"))
+        write(page, "tampered")
+        with self.assertRaises(ValueError):
+            merge_shards([first, second], self.static, output)
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == "__main__":
+    unittest.main()
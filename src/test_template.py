@@ -0,0 +1,120 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode, NodeArena
+from htmlnode import RenderContext
+from template import Template, rewrite_html_urls, minify_html
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>there</p>"),
+            "<title>Hi</title><article><p>there</p></article>",
+        )
+
+    def test_render_repeated_slot(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render(Title="Tom"), "Tom - Tom")
+
+    def test_render_missing_slot(self):
+        template = Template("<title>{{ Title }}</title>")
+        with self.assertRaises(ValueError):
+            template.render(Content="<p></p>")
+
+    def test_no_slots(self):
+        template = Template("<p>static</p>")
+        self.assertEqual(template.render(), "<p>static</p>")
+
+    def test_basepath_applied_at_compile_time(self):
+        template = Template("<link href=\"/index.css\"><img src=\"/a.png\">{{ Content }}", "/ssg/")
+        self.assertEqual(template.pieces[0], "<link href=\"/ssg/index.css\"><img src=\"/ssg/a.png\">")
+        # String slot values are final HTML and are never rewritten
+        self.assertEqual(template.render(Content="<a href=\"/x\">"), "<link href=\"/ssg/index.css\"><img src=\"/ssg/a.png\"><a href=\"/x\">")
+
+    def test_render_into_streams_nodes(self):
+        template = Template("<link href=\"/index.css\"><title>{{ Title }}</title>{{ Content }}", "/ssg/")
+        node = ParentNode("p", [LeafNode("a", "Tom", {"href": "/blog/tom"}), LeafNode(None, "!")])
+        fragments = []
+        template.render_into(fragments.append, Title="Tom", Content=node)
+        self.assertGreater(len(fragments), 3)
+        self.assertEqual(
+            "".join(fragments),
+            template.render(Title="Tom", Content=node),
+        )
+        self.assertEqual(
+            "".join(fragments),
+            "<link href=\"/ssg/index.css\"><title>Tom</title><p><a href=\"/ssg/blog/tom\">Tom</a>!</p>",
+        )
+
+    def test_rewrite_html_urls(self):
+        self.assertEqual(rewrite_html_urls("<a href=\"/blog\">", None), "<a href=\"/blog\">")
+        context = RenderContext("/ssg/", {"index.css": "index.0123abcd.css"})
+        self.assertEqual(rewrite_html_urls("<a href=\"/blog\">", context), "<a href=\"/ssg/blog\">")
+        self.assertEqual(
+            rewrite_html_urls("<link href=\"/index.css\"><a data-href=\"/x\" href=\"https://boot.dev\">", context),
+            "<link href=\"/ssg/index.0123abcd.css\"><a data-href=\"/x\" href=\"https://boot.dev\">",
+        )
+
+    def test_fingerprinted_assets(self):
+        template = Template("<link href=\"/index.css\">{{ Content }}", "/", {"index.css": "index.0123abcd.css", "images/tom.png": "images/tom.89abcdef.png"})
+        node = ParentNode("p", [LeafNode("img", "", {"src": "/images/tom.png", "alt": "Tom"}), LeafNode("a", "Tom", {"href": "/images/tom.png#top"})])
+        self.assertEqual(
+            template.render(Content=node),
+            "<link href=\"/index.0123abcd.css\"><p><img src=\"/images/tom.89abcdef.png\" alt=\"Tom\"></img><a href=\"/images/tom.89abcdef.png#top\">Tom</a></p>",
+        )
+        fragments = []
+        template.render_into(fragments.append, Content=node)
+        self.assertEqual("".join(fragments), template.render(Content=node))
+
+
+    def test_image_hints(self):
+        template = Template("<img src=\"/logo.png\">{{ Content }}", "/ssg/", None, {"images/tom.png": (928, 468)})
+        node = ParentNode("p", [
+            LeafNode("img", "", {"src": "/images/tom.png", "alt": "Tom"}),
+            LeafNode("img", "", {"src": "https://example.com/a.png", "alt": "A"}),
+        ])
+        expected = (
+            "<img src=\"/ssg/logo.png\"><p><img src=\"/ssg/images/tom.png\" alt=\"Tom\" width=\"928\" height=\"468\"></img>"
+            "<img src=\"https://example.com/a.png\" alt=\"A\" loading=\"lazy\" decoding=\"async\"></img></p>"
+        )
+        # Every page starts counting images afresh, whichever way it renders
+        for _ in range(2):
+            self.assertEqual(template.render(Content=node), expected)
+            for content in (node, NodeArena.from_node(node)):
+                fragments = []
+                template.render_into(fragments.append, Content=content)
+                self.assertEqual("".join(fragments), expected)
+
+
+    def test_minify_html(self):
+        self.assertEqual(
+            minify_html("<!doctype html>\n<html>\n  <head>\n    <title> {{ Title }} </title>\n  </head>\n  <body>\n    <p>a  <b>b</b>\n <i>c</i></p>\n    <pre>  x\n  y</pre>\n  </body>\n</html>\n"),
+            "<!doctype html><html><head><title>{{ Title }}</title></head><body><p>a <b>b</b> <i>c</i></p><pre>  x\n  y</pre></body></html>",
+        )
+        self.assertEqual(minify_html("<script>\n if (a  <b) {}\n</script>\n"), "<script>\n if (a  <b) {}\n</script>")
+        self.assertEqual(
+            minify_html("<head>\n  <meta name=\"description\" content=\"Tolkien  fans,\n   unite\">\n  <link title=\"a > b  c\">\n</head>"),
+            "<head><meta name=\"description\" content=\"Tolkien  fans,\n   unite\"><link title=\"a > b  c\"></head>",
+        )
+
+    def test_minify_rendering(self):
+        template = Template("<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n", minify=True)
+        node = ParentNode("div", [
+            ParentNode("blockquote", [LeafNode(None, "one\n  two\u00a0 three")]),
+            ParentNode("p", [LeafNode("code", "a  b"), LeafNode("b", "c\n d")]),
+            ParentNode("pre", [LeafNode("code", "x\n    y")]),
+        ])
+        expected = (
+            "<html><body><div><blockquote>one two\u00a0 three</blockquote>"
+            "<p><code>a  b</code><b>c d</b></p><pre><code>x\n    y</code></pre></div></body></html>"
+        )
+        self.assertEqual(template.render(Content=node), expected)
+        for content in (node, NodeArena.from_node(node)):
+            fragments = []
+            template.render_into(fragments.append, Content=content)
+            self.assertEqual("".join(fragments), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
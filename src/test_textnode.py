@@ -356,6 +356,37 @@ class TestTextNode(unittest.TestCase):
             new_nodes,
         )
 
+    def test_text_to_textnodes_repeated_url_prefix(self):
+        text = "See [docs](https://www.boot.dev/courses) and [home](https://www.boot.dev)."
+        new_nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("See ", TextType.NORMAL),
+                TextNode("docs", TextType.LINK, "https://www.boot.dev/courses"),
+                TextNode(" and ", TextType.NORMAL),
+                TextNode("home", TextType.LINK, "https://www.boot.dev"),
+                TextNode(".", TextType.NORMAL)
+            ],
+            new_nodes,
+        )
+
+    def test_text_to_textnodes_many_links(self):
+        text = " | ".join(f"[page {i}](/page/{i})" for i in range(200))
+        new_nodes = text_to_textnodes(text)
+        self.assertEqual(len(new_nodes), 399)
+        self.assertEqual(new_nodes[-1], TextNode("page 199", TextType.LINK, "/page/199"))
+
+    def test_text_to_textnodes_unclosed(self):
+        for text in ["This isn't a **bold statement!", "dangling _italic", "stray ` tick"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_text_to_textnodes_empty_section(self):
+        self.assertListEqual(
+            [TextNode("a", TextType.NORMAL), TextNode("b", TextType.NORMAL)],
+            text_to_textnodes("a****b"),
+        )
+
 
 
 if __name__ == "__main__":
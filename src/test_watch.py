@@ -0,0 +1,109 @@
+import os
+import threading
+import unittest
+
+import main
+from incremental import hash_file, load_manifest
+from watch import Site, ReloadState, snapshot, diff_snapshots, inject_live_reload, LIVE_RELOAD_PATH
+from fixtures import TempDirTestCase, read, write
+
+class TestWatch(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content") + "/"
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.docs = os.path.join(root, "docs") + "/"
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(self.content + "index.md", "# Home")
+        write(self.content + "blog/tom/index.md", "# Tom")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        self.site = Site("/", self.content, self.static, self.template, self.docs, os.path.join(root, "cache"))
+        self.site.build()
+
+    def test_snapshot_diff(self):
+        before = snapshot(self.site.watched_paths())
+        write(self.content + "index.md", "# Home again")
+        os.remove(self.content + "blog/tom/index.md")
+        after = snapshot(self.site.watched_paths())
+        self.assertEqual(
+            diff_snapshots(before, after),
+            sorted([os.path.normpath(self.content + "index.md"), os.path.normpath(self.content + "blog/tom/index.md")]),
+        )
+
+    def test_rebuild_only_changed_page(self):
+        write(self.content + "index.md", "# Home again")
+        rebuilt = self.site.rebuild([os.path.normpath(self.content + "index.md")])
+        self.assertEqual(rebuilt, [os.path.normpath(self.content + "index.md")])
+        self.assertEqual(read(self.docs + "index.html"), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+    def test_rebuild_continues_past_failed_page(self):
+        write(self.content + "blog/tom/index.md", "no title yet")
+        write(self.content + "index.md", "# Home again")
+        changed = sorted([os.path.normpath(self.content + "blog/tom/index.md"), os.path.normpath(self.content + "index.md")])
+        rebuilt = self.site.rebuild(changed)
+        self.assertEqual(rebuilt, [os.path.normpath(self.content + "index.md")])
+        self.assertEqual(list(self.site.failures), [self.content + "blog/tom/index.md"])
+        self.assertEqual(read(self.docs + "index.html"), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+    def test_rebuild_records_manifest_entries(self):
+        write(self.content + "index.md", "# Home again")
+        self.site.rebuild([os.path.normpath(self.content + "index.md")])
+        manifest = load_manifest(self.site.cache_dir)
+        self.assertEqual(manifest[self.content + "index.md"]["source_hash"], hash_file(self.content + "index.md"))
+
+        # So a later incremental build has nothing left to render
+        generate_page = main.generate_page
+        def fail(*args):
+            raise AssertionError("page rendered again")
+        main.generate_page = fail
+        try:
+            main.generate_pages_incremental("/", self.content, self.template, self.docs, self.site.cache_dir)
+        finally:
+            main.generate_page = generate_page
+
+    def test_rebuild_template_rebuilds_all(self):
+        write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        rebuilt = self.site.rebuild([os.path.normpath(self.template)])
+        self.assertEqual(len(rebuilt), 2)
+        self.assertEqual(read(self.docs + "blog/tom/index.html"), "<h2>Tom</h2><div><h1>Tom</h1></div>")
+
+    def test_first_build_survives_failed_page(self):
+        write(self.content + "broken.md", "no title here")
+        site = Site("/", self.content, self.static, self.template, self.docs, os.path.join(self.root, "cache2"))
+        site.build()
+        self.assertEqual(list(site.failures), [self.content + "broken.md"])
+        self.assertNotEqual(site.template, None)
+        self.assertEqual(len(site.pages), 3)
+        self.assertEqual(read(self.docs + "index.html"), "<title>Home</title><div><h1>Home</h1></div>")
+
+    def test_template_change_survives_failed_page(self):
+        write(self.content + "blog/tom/index.md", "no title yet")
+        write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        changed = sorted([os.path.normpath(self.template), os.path.normpath(self.content + "blog/tom/index.md")])
+        rebuilt = self.site.rebuild(changed)
+        self.assertEqual(rebuilt, [os.path.normpath(self.content + "index.md")])
+        self.assertEqual(list(self.site.failures), [self.content + "blog/tom/index.md"])
+        self.assertEqual(read(self.docs + "index.html"), "<h2>Home</h2><div><h1>Home</h1></div>")
+
+    def test_rebuild_removes_deleted_page(self):
+        os.remove(self.content + "blog/tom/index.md")
+        self.site.rebuild([os.path.normpath(self.content + "blog/tom/index.md")])
+        self.assertFalse(os.path.exists(self.docs + "blog"))
+
+    def test_inject_live_reload(self):
+        html = inject_live_reload("<body><p>hi</p></body>")
+        self.assertTrue(html.startswith("<body><p>hi</p><script>"))
+        self.assertTrue(html.endswith("</script>\n</body>"))
+        self.assertIn(LIVE_RELOAD_PATH, html)
+
+    def test_reload_state(self):
+        state = ReloadState()
+        self.assertEqual(state.wait_for_change(""), 0)
+        threading.Timer(0.05, state.bump).start()
+        self.assertEqual(state.wait_for_change("0", timeout=5), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
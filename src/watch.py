@@ -0,0 +1,249 @@
+import argparse
+import http.server
+import os
+import sys
+import threading
+import time
+import traceback
+
+from assets import sync_static
+from incremental import hash_file, page_entry, load_manifest, save_manifest, remove_output
+from main import find_pages, generate_page, generate_pages_incremental, format_failures, BuildFailed
+from parsecache import BodyCache, FragmentCache
+from template import load_template
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_TIMEOUT = 25
+
+# Long-polls the server and reloads as soon as the build version moves on
+LIVE_RELOAD_SCRIPT = """<script>
+(function poll(version) {
+  fetch("%s?since=" + version)
+    .then((response) => response.text())
+    .then((latest) => {
+      if (version !== "" && latest !== version) {
+        location.reload();
+        return;
+      }
+      poll(latest);
+    })
+    .catch(() => setTimeout(() => poll(version), 1000));
+})("");
+</script>
+""" % LIVE_RELOAD_PATH
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Rebuild the site on every change and serve ./docs with live reload")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between checks for changed files")
+    parser.add_argument("--cache-dir", default="./.ssg-cache")
+    return parser.parse_args(argv)
+
+def snapshot(paths):
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    # Deleted between listing and stat, the next poll sees it gone
+                    continue
+                files[os.path.normpath(file_path)] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def diff_snapshots(old, new):
+    return sorted([path for path in old.keys() | new.keys() if old.get(path) != new.get(path)])
+
+def inject_live_reload(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+
+class ReloadState:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def bump(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait_for_change(self, since, timeout=LIVE_RELOAD_TIMEOUT):
+        with self.condition:
+            self.condition.wait_for(lambda: str(self.version) != since, timeout)
+            return self.version
+
+class Site:
+    def __init__(self, basepath, content_dir, static_dir, template_path, dest_dir, cache_dir):
+        self.basepath = basepath
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.cache_dir = cache_dir
+        self.body_cache = BodyCache(cache_dir)
+        self.fragment_cache = FragmentCache(cache_dir)
+        self.template = None
+        self.pages = {}
+        self.failures = {}
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, self.template_path]
+
+    def find_pages(self):
+        # Keyed by normalized path to match the snapshots; the path as found
+        # is kept too, since that is what the page manifest is keyed by
+        pages = {}
+        for from_path, dest_path in find_pages(self.content_dir, self.dest_dir):
+            pages[os.path.normpath(from_path)] = (from_path, dest_path)
+        return pages
+
+    def build(self):
+        self.failures = {}
+        sync_static(self.static_dir, self.dest_dir, self.cache_dir)
+        self.build_pages()
+        self.template = load_template(self.template_path, self.basepath)
+        self.pages = self.find_pages()
+
+    def build_pages(self):
+        # Broken pages are reported, not fatal; the incremental build keeps
+        # them out of the manifest, so the next one tries them again
+        try:
+            generate_pages_incremental(self.basepath, self.content_dir, self.template_path, self.dest_dir, self.cache_dir)
+        except BuildFailed as e:
+            self.failures.update(e.failures)
+
+    def rebuild(self, changed_paths):
+        # Only the pages touched by the change are regenerated; the compiled
+        # template and everything imported stay warm between rebuilds
+        static_root = os.path.normpath(self.static_dir) + os.sep
+        content_root = os.path.normpath(self.content_dir) + os.sep
+        if any(path.startswith(static_root) for path in changed_paths):
+            sync_static(self.static_dir, self.dest_dir, self.cache_dir)
+
+        self.failures = {}
+        pages = self.find_pages()
+        manifest = load_manifest(self.cache_dir)
+        for path in self.pages.keys() - pages.keys():
+            from_path, dest_path = self.pages[path]
+            remove_output(dest_path, self.dest_dir)
+            manifest.pop(from_path, None)
+        self.pages = pages
+
+        if os.path.normpath(self.template_path) in changed_paths:
+            self.template = load_template(self.template_path, self.basepath)
+            # Bodies kept by the incremental build are wrapped again, so a
+            # template edit parses only the pages whose source also changed
+            save_manifest(self.cache_dir, manifest)
+            self.build_pages()
+            return sorted(path for path in pages if pages[path][0] not in self.failures)
+
+        targets = [path for path in changed_paths if path.startswith(content_root) and path in pages]
+
+        # One broken page must not hold back the rest of this batch; the
+        # snapshot has already moved on, so skipped pages would never be retried
+        template_hash = hash_file(self.template_path)
+        rebuilt = []
+        for path in targets:
+            from_path, dest_path = pages[path]
+            try:
+                generate_page(self.basepath, from_path, self.template_path, dest_path, self.template, None, self.body_cache, self.fragment_cache)
+            except Exception as e:
+                self.failures[from_path] = f"{type(e).__name__}: {e}"
+                # Left out of the manifest so the next incremental build retries it
+                manifest.pop(from_path, None)
+                continue
+            # Recorded like an incremental build would, so the next one does
+            # not render this page again
+            manifest[from_path] = page_entry(hash_file(from_path), template_hash, self.basepath, dest_path)
+            rebuilt.append(path)
+        save_manifest(self.cache_dir, manifest)
+        return rebuilt
+
+def make_handler(directory, state):
+    class LiveReloadHandler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path == LIVE_RELOAD_PATH:
+                since = query.partition("since=")[2]
+                self.send_text(str(state.wait_for_change(since)), "text/plain")
+                return
+
+            file_path = self.translate_path(path)
+            if path.endswith("/") and os.path.isdir(file_path):
+                file_path = os.path.join(file_path, "index.html")
+            if not file_path.endswith(".html") or not os.path.isfile(file_path):
+                super().do_GET()
+                return
+            with open(file_path) as html_file:
+                self.send_text(inject_live_reload(html_file.read()), "text/html")
+
+        def send_text(self, text, content_type):
+            body = text.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return LiveReloadHandler
+
+def serve(directory, port, state):
+    server = http.server.ThreadingHTTPServer(("", port), make_handler(directory, state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def watch(site, port, interval):
+    state = ReloadState()
+    site.build()
+    if site.failures:
+        print(format_failures(site.failures))
+    known = snapshot(site.watched_paths())
+    serve(site.dest_dir, port, state)
+    print(f"Serving {site.dest_dir} on http://localhost:{port}, watching for changes")
+
+    while True:
+        time.sleep(interval)
+        current = snapshot(site.watched_paths())
+        changed = diff_snapshots(known, current)
+        if not changed:
+            continue
+        known = current
+        start = time.perf_counter()
+        try:
+            rebuilt = site.rebuild(changed)
+        except Exception:
+            # A half-saved file should not end the session, the next save retries
+            traceback.print_exc()
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        if site.failures:
+            print(format_failures(site.failures))
+        print(f"Rebuilt {len(rebuilt)} page(s) in {elapsed:.1f}ms")
+        state.bump()
+
+def main():
+    args = parse_args(sys.argv[1:])
+    site = Site(args.basepath, "./content/", "./static", "./template.html", "./docs/", args.cache_dir)
+    try:
+        watch(site, args.port, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()